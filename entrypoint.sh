@@ -1,10 +1,13 @@
 #!/usr/bin/env sh
 set -e
 
-ollama serve &
+# Reference point for the start-up timings logged by the algorithm
+CONTAINER_START_TS="$(date +%s.%N)"
+case "${CONTAINER_START_TS}" in *N) CONTAINER_START_TS="$(date +%s)" ;; esac
+export CONTAINER_START_TS
 
-until curl --silent http://localhost:11434/api/tags >/dev/null; do
-  sleep 1 &
-done
+ollama serve &
 
+# No waiting here: the algorithm probes Ollama with backoff and pulls/loads the model
+# in the background while it reads and chunks the input
 [ -z "${TEST}" ] && { [ -z "${DEV}" ] && python3 -u src/implementation/test_rag.py || python3 -u src/main.py; }
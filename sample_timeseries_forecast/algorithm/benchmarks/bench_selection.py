@@ -0,0 +1,90 @@
+"""Benchmarks automatic seasonality and lag selection against building every feature.
+
+The series is hourly, with a trend, daily and weekly seasonality and AR(2) noise. The
+"all features" configuration asks for every periodicity and `--lags` lags; "auto"
+takes those as candidates and keeps what the target shows. Each case builds the
+features, trains the model and scores the test split.
+
+Run from `sample_timeseries_forecast/algorithm`:
+
+    python benchmarks/bench_selection.py --rows 20000 --lags 10 --estimators 100
+"""
+
+import argparse
+import sys
+import time
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+import pandas as pd
+from implementation.data import DatasetParameters, InputParameters, ModelParameters, Periodicity
+from implementation.window import WindowGenerator
+from sklearn.ensemble import AdaBoostRegressor
+
+
+def series(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    noise = rng.normal(size=rows)
+    for t in range(2, rows):
+        noise[t] += 0.6 * noise[t - 1] - 0.3 * noise[t - 2]
+    hours = np.arange(rows)
+    return pd.DataFrame(
+        {
+            "Date": pd.date_range("2000-01-01", periods=rows, freq="h").astype(str),
+            "Sales": 100
+            + 0.001 * hours
+            + 10 * np.sin(2 * np.pi * hours / 24)
+            + 5 * np.sin(2 * np.pi * hours / (24 * 7))
+            + noise,
+        }
+    )
+
+
+def run(df: pd.DataFrame, args: argparse.Namespace, auto: bool) -> list:
+    params = InputParameters(
+        model=ModelParameters(metrics=["neg_mean_squared_error"]),
+        dataset=DatasetParameters(
+            target_column="Sales",
+            datetime_column="Date",
+            split=0.7,
+            lags=args.lags,
+            periodicity=list(Periodicity),
+            auto_features=auto,
+        ),
+    )
+
+    start = time.perf_counter()
+    window = WindowGenerator(df.copy(), params, lean=args.lean)
+    X_train, X_test, y_train, y_test = window.preprocess()
+    features = time.perf_counter() - start
+
+    model = AdaBoostRegressor(n_estimators=args.estimators, random_state=0)
+    start = time.perf_counter()
+    window.train(X_train, y_train, model)
+    training = time.perf_counter() - start
+
+    mse = window.evaluate(model, X_test, y_test, params.model.metrics)["neg_mean_squared_error"]
+    selected = f"{','.join(p.value for p in window.periodicity)} / {window.lags}"
+    return [selected, X_train.shape[1], f"{features:.2f}", f"{training:.2f}", f"{mse:.3f}"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--lags", type=int, default=10)
+    parser.add_argument("--estimators", type=int, default=100)
+    parser.add_argument("--lean", action="store_true", help="Build features in memory-lean mode")
+    args = parser.parse_args()
+
+    df = series(args.rows)
+    columns = ["case", "periods / lags", "features", "build (s)", "train (s)", "test MSE"]
+    rows = [[name, *run(df, args, auto)] for name, auto in (("all features", False), ("auto", True))]
+    widths = [max(len(str(row[i])) for row in [columns, *rows]) + 2 for i in range(len(columns))]
+    for row in [columns, *rows]:
+        print("".join(f"{value:>{width}}" for value, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-from functools import cached_property
+import json
+import os
+from dataclasses import asdict
+from functools import cache, cached_property
 from logging import getLogger
 from pathlib import Path
 from typing import Any, Optional
@@ -7,17 +10,32 @@ import orjson
 import pandas as pd
 from implementation import estimators
 from implementation.data import InputParameters
+from implementation.executor import FileExecutor, FileReport, FileTask, job_files
+from implementation.source import open_input
 from implementation.window import WindowGenerator
 from oceanprotocol_job_details.ocean import JobDetails
 from sklearn.utils import all_estimators
 
 logger = getLogger(__name__)
 
+# Rough ratio of a parsed DataFrame's memory to its CSV size, for admitting files
+_CSV_EXPANSION = 4
+
+
+@cache
+def registry() -> dict[str, type]:
+    """scikit-learn's estimators by name; building it imports most of scikit-learn, so
+    it is done once per process (and before forking in daemon mode)."""
+
+    return dict(all_estimators())
+
 
 class Algorithm:
     def __init__(self, job_details: JobDetails[InputParameters]) -> None:
         self._job_details: JobDetails[InputParameters] = job_details
         self.results: Optional[Any] = None
+        self.file_reports: list[FileReport] = []
+        self.selection: Optional[dict] = None
 
     def _validate_input(self) -> None:
         assert self._job_details.files, "No files found"
@@ -42,17 +60,28 @@ class Algorithm:
         logger.debug(f"Data head: \n{df.head()}")
 
         # Window generator in charge of splitting the data and preprocessing it
-        self.window = WindowGenerator(df, self._job_details.input_parameters)
+        self.window = WindowGenerator(
+            df,
+            self._job_details.input_parameters,
+            lean=os.getenv("MEMORY_MODE", "").lower() == "lean",
+        )
+        # The window holds the only reference, so lean mode can release it early
+        del df
+        self.selection = self.window.selection
         X_train, X_test, y_train, y_test = self.window.preprocess()
 
         # Get the scikit-learn model
         model = self._model
         self.window.train(X_train, y_train, model)
+        model_parameters = self._job_details.input_parameters.model
         evaluation_results = self.window.evaluate(
             model,
             X_test,
             y_test,
-            self._job_details.input_parameters.model.metrics,
+            model_parameters.metrics,
+            bootstrap=model_parameters.bootstrap,
+            confidence=model_parameters.confidence or 0.95,
+            block_size=model_parameters.block_size,
         )
 
         self.results = (
@@ -70,14 +99,23 @@ class Algorithm:
         score_path = path / "scores.csv"
         parameters_path = path / "parameters.json"
         plotting_path = path / "plot.png"
+        files_path = path / "files.json"
 
-        # === Save algorithm run parameters ===
+        # === Save algorithm run parameters, and the features selected from the data ===
         with open(parameters_path, "wb") as f:
             try:
-                f.write(orjson.dumps(self._job_details.input_parameters))
+                parameters = self._job_details.input_parameters
+                if self.selection:
+                    parameters = {**asdict(parameters), "selection": self.selection}
+                f.write(orjson.dumps(parameters))
             except Exception as e:
                 logger.exception(f"Error saving algorithm parameters: {e}")
 
+        # === Save per-file read status and timing ===
+        if self.file_reports:
+            with open(files_path, "w") as f:
+                json.dump([report.to_dict() for report in self.file_reports], f, indent=2)
+
         if self.results:
             import cloudpickle  # type: ignore
 
@@ -115,19 +153,54 @@ class Algorithm:
 
     @property
     def _df(self) -> pd.DataFrame:
-        # Right now we only support passing one DID with one file.
-        try:
-            filepath = self._job_details.files.files[0].input_files[0]
-        except IndexError:
+        """Reads every input file of every DID, concurrently, into one dataset.
+
+        Shards are concatenated in DID and file name order, keeping their index, and when
+        there are several they are sorted by the datetime column (by the index if that is
+        the datetime) so lag features follow the timeline. Files that cannot be read are
+        reported in `file_reports` and left out.
+        """
+
+        tasks = job_files(self._job_details.files)
+        if not tasks:
             logger.error("No input files found")
             raise ValueError("No input files found")
 
-        logger.info(f"Getting input data from file: {filepath}")
-        return pd.read_csv(
-            filepath,
-            sep=self._job_details.input_parameters.dataset.separator,
-            index_col=0,
+        workers = os.getenv("FILE_WORKERS")
+        executor = FileExecutor(
+            workers=int(workers) if workers else None,
+            cost=lambda task: task.size * _CSV_EXPANSION,
         )
+        self.file_reports = executor.map(self._read_file, tasks)
+
+        frames = [report.value for report in self.file_reports if report.status == "ok"]
+        for report in self.file_reports:
+            report.details = {"rows": len(report.value)} if report.status == "ok" else {}
+            report.value = None
+        if not frames:
+            raise ValueError("None of the input files could be read")
+        if len(frames) == 1:
+            return frames[0]
+
+        # Keeps the `index_col` index, as a single file does
+        df = pd.concat(frames)
+        datetime_column = self._job_details.input_parameters.dataset.datetime_column
+        if datetime_column in df.columns:
+            return df.sort_values(
+                datetime_column,
+                key=lambda column: pd.to_datetime(column, errors="coerce"),
+                kind="stable",
+            )
+        return df.sort_index(kind="stable")
+
+    def _read_file(self, task: FileTask) -> pd.DataFrame:
+        logger.info(f"Getting input data from file: {task.path}")
+        with open_input(task.path) as f:
+            return pd.read_csv(
+                f,
+                sep=self._job_details.input_parameters.dataset.separator,
+                index_col=0,
+            )
 
     @cached_property
     def _model(self) -> Any:
@@ -136,7 +209,7 @@ class Algorithm:
         model = self._job_details.input_parameters.model
         logger.info(f"Creating model: {model}")
 
-        estimators = {estimator[0]: estimator[1] for estimator in all_estimators()}
+        estimators = registry()
         if model.name not in estimators:
             raise ValueError(f"Model {model} not found in scikit-learn estimators")
 
@@ -0,0 +1,114 @@
+import math
+import os
+from logging import getLogger
+from typing import Callable, Mapping, Optional
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score, root_mean_squared_error
+
+logger = getLogger(__name__)
+
+ScoreFunc = Callable[[np.ndarray, np.ndarray], float]
+
+# Largest resamples x rows chunk gathered at once, in elements
+_CHUNK_ELEMENTS = 2**22
+
+
+def _r2(y_true: np.ndarray, y_pred: np.ndarray) -> np.ndarray:
+    residual = ((y_true - y_pred) ** 2).sum(axis=1)
+    total = ((y_true - y_true.mean(axis=1, keepdims=True)) ** 2).sum(axis=1)
+    return 1 - residual / total
+
+
+# Row-wise versions of common scorers, scoring every resample of a chunk in one pass
+_BATCHED: dict[ScoreFunc, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    mean_squared_error: lambda t, p: ((t - p) ** 2).mean(axis=1),
+    root_mean_squared_error: lambda t, p: np.sqrt(((t - p) ** 2).mean(axis=1)),
+    mean_absolute_error: lambda t, p: np.abs(t - p).mean(axis=1),
+    r2_score: _r2,
+}
+
+
+def block_starts(
+    rows: int,
+    resamples: int,
+    block_size: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Draws the first row of every block of every resample as one array.
+
+    A moving-block bootstrap resample concatenates `ceil(rows / block_size)` runs of
+    consecutive rows starting at random positions, which keeps the short-range
+    dependence of a time series within each block.
+    """
+
+    blocks = math.ceil(rows / block_size)
+    return rng.integers(0, rows - block_size + 1, size=(resamples, blocks))
+
+
+def resample_indices(starts: np.ndarray, block_size: int, rows: int) -> np.ndarray:
+    """Expands block starts into a (resamples, rows) array of row indices."""
+
+    indices = starts[:, :, None] + np.arange(block_size)
+    return indices.reshape(len(starts), -1)[:, :rows]
+
+
+def _score_chunk(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    starts: np.ndarray,
+    block_size: int,
+    score_funcs: list[ScoreFunc],
+) -> np.ndarray:
+    indices = resample_indices(starts, block_size, len(y_true))
+    true, pred = y_true[indices], y_pred[indices]
+    scores = np.empty((len(starts), len(score_funcs)))
+    for j, func in enumerate(score_funcs):
+        if func in _BATCHED:
+            scores[:, j] = _BATCHED[func](true, pred)
+        else:
+            scores[:, j] = [func(t, p) for t, p in zip(true, pred)]
+    return scores
+
+
+def bootstrap_intervals(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    score_funcs: Mapping[str, ScoreFunc],
+    resamples: int = 1000,
+    confidence: float = 0.95,
+    block_size: Optional[int] = None,
+    seed: Optional[int] = 0,
+    n_jobs: Optional[int] = None,
+) -> dict[str, tuple[float, float]]:
+    """Percentile confidence intervals of every metric from a moving-block bootstrap.
+
+    `y_true` and `y_pred` must be in time order. The block size defaults to
+    `rows ** (1/3)`. Predictions are not recomputed: resamples only reindex them, in
+    chunks scored in parallel (`n_jobs`, all CPUs by default).
+    """
+
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    rows = len(y_true)
+    block_size = min(rows, block_size or max(1, round(rows ** (1 / 3))))
+
+    starts = block_starts(rows, resamples, block_size, np.random.default_rng(seed))
+
+    names, funcs = list(score_funcs), list(score_funcs.values())
+    jobs = n_jobs or os.cpu_count() or 1
+    chunks = max(jobs, math.ceil(resamples * rows / _CHUNK_ELEMENTS))
+    # NumPy releases the GIL in the batched scorers, others need processes
+    backend = "threading" if all(func in _BATCHED for func in funcs) else "loky"
+    scores = np.concatenate(
+        Parallel(n_jobs=jobs, backend=backend)(
+            delayed(_score_chunk)(y_true, y_pred, chunk, block_size, funcs)
+            for chunk in np.array_split(starts, min(chunks, resamples))
+        )
+    )
+
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(scores, [alpha, 1 - alpha], axis=0)
+    logger.info(f"Bootstrapped {resamples} resamples in blocks of {block_size} rows")
+    return {name: (float(low[j]), float(high[j])) for j, name in enumerate(names)}
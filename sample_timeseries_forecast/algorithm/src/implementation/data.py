@@ -36,6 +36,9 @@ class ModelParameters:
     name: str = "AdaBoostRegressor"
     parameters: dict[str, any] | None = None
     metrics: List[str] = field(default_factory=lambda: ["neg_mean_squared_error"])
+    bootstrap: int | None = None
+    confidence: float | None = 0.95
+    block_size: int | None = None
 
 
 @dataclass
@@ -46,6 +49,7 @@ class DatasetParameters:
     split: float | None = 0.7
     lags: int | None = 3
     periodicity: List[Periodicity] | None = None
+    auto_features: bool | None = False
 
 
 @dataclass
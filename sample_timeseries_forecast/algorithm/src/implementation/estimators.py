@@ -2,13 +2,23 @@ from dataclasses import dataclass
 from logging import getLogger
 from typing import Self, Sequence
 
+import numpy as np
 from numpy import cos, log, pi, sin
-from pandas import DataFrame, Timestamp, to_datetime
+from pandas import DataFrame, DatetimeIndex, Timestamp, to_datetime
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import MinMaxScaler
 
 logger = getLogger(__name__)
 
+# Length of each periodicity, in days
+PERIODS = {
+    "day": 1,
+    "week": 7,
+    "month": 30.4368,
+    "year": 365.25,
+}
+
 
 class Imputer(BaseEstimator, TransformerMixin):
     """Imputes missing values based on a strategy for each column that is decided by it's characteristics."""
@@ -122,12 +132,6 @@ class Periodicity(BaseEstimator, TransformerMixin):
         rate = lambda timestamp, period: timestamp * 2 * pi / period  # noqa
 
         day_s = 24 * 60 * 60
-        periods = {
-            "day": 1,
-            "week": 7,
-            "month": 30.4368,
-            "year": 365.25,
-        }
 
         try:
             # Also, add some periodicity features
@@ -136,7 +140,7 @@ class Periodicity(BaseEstimator, TransformerMixin):
 
             try:
                 for name in self.periodicity:
-                    period = periods[name] * day_s
+                    period = PERIODS[name] * day_s
                     X[f"{name}_sin"] = timestamp_s.apply(lambda x: sin(rate(x, period)))
                     X[f"{name}_cos"] = timestamp_s.apply(lambda x: cos(rate(x, period)))
             except ValueError:
@@ -146,3 +150,115 @@ class Periodicity(BaseEstimator, TransformerMixin):
 
         logger.info("Periodicity processing done")
         return X.set_index(self.datetime_column)
+
+    def to_block(self, X: DataFrame, dtype: type = np.float32) -> tuple[np.ndarray, list[str], DatetimeIndex]:
+        """Computes the same features as `transform` into one preallocated array.
+
+        Columns follow the order of `transform`, except that the target comes last so the
+        features and the target can be sliced out as views. Rows are dropped exactly as
+        `transform` drops them, tracked as row numbers rather than frame copies: each lag
+        is shifted over the rows left by the previous one, then rows with a missing value
+        in any column so far are dropped. Returns the array, its column names and the
+        datetime of each row.
+        """
+
+        # Logarithms of non-positive targets are `transform`'s NaN and -inf too
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._to_block(X, dtype)
+
+    def _to_block(self, X: DataFrame, dtype: type) -> tuple[np.ndarray, list[str], DatetimeIndex]:
+        sources = [c for c in X.columns if c not in (self.datetime_column, self.target_column)]
+        target = X[self.target_column].to_numpy(dtype=np.float64)
+        log_target = log(target)
+
+        # Rows still in `transform`'s frame, and the row each lag column was taken from
+        rows = np.arange(len(X))
+        lagged: list[np.ndarray] = []
+        if self.lags:
+            # The first `dropna` sees every input column and the logarithm of the target
+            complete = X.notna().to_numpy().all(axis=1) & ~np.isnan(log_target)
+        for i in range(self.lags):
+            past = np.full(len(rows), -1)
+            past[i + 1 :] = rows[: len(rows) - i - 1]
+            missing = past < 0
+            if i == 0:
+                missing |= ~complete[rows]
+            else:
+                # The log lag and log difference added after the previous `dropna`
+                previous = lagged[-1]
+                log_lag = log_target[previous]
+                missing |= np.isnan(log_lag) | np.isnan(log_target[rows] - log_lag)
+            missing[~missing] |= np.isnan(target[past[~missing]])
+            keep = ~missing
+            rows, past = rows[keep], past[keep]
+            lagged = [column[keep] for column in lagged] + [past]
+
+        count = len(rows)
+        if count <= 0:
+            raise ValueError(f"Not enough rows ({len(target)}) for {self.lags} lags")
+
+        names = [*sources, f"log_{self.target_column}"]
+        for i in range(self.lags):
+            names += [
+                f"{self.target_column}_lag_{i + 1}",
+                f"log_{self.target_column}_lag_{i + 1}",
+                f"log_diff_{i + 1}",
+            ]
+        for name in self.periodicity:
+            names += [f"{name}_sin", f"{name}_cos"]
+        names.append(self.target_column)
+
+        block = np.empty((count, len(names)), dtype=dtype)
+        column = iter(range(len(names)))
+        for source in sources:
+            np.copyto(block[:, next(column)], X[source].to_numpy()[rows], casting="unsafe")
+        current = log_target[rows]
+        np.copyto(block[:, next(column)], current, casting="same_kind")
+        for past in lagged:
+            np.copyto(block[:, next(column)], target[past], casting="same_kind")
+            np.copyto(block[:, next(column)], log_target[past], casting="same_kind")
+            np.subtract(current, log_target[past], out=block[:, next(column)], casting="same_kind")
+        del log_target, current, lagged
+
+        index = DatetimeIndex(to_datetime(X[self.datetime_column]).to_numpy()[rows])
+        if self.periodicity:
+            seconds = index.asi8 / 1e9
+            for name in self.periodicity:
+                angle = seconds * 2 * pi / (PERIODS[name] * 24 * 60 * 60)
+                np.sin(angle, out=block[:, next(column)], casting="same_kind")
+                np.cos(angle, out=block[:, next(column)], casting="same_kind")
+            del seconds, angle
+        np.copyto(block[:, next(column)], target[rows], casting="same_kind")
+
+        logger.info(f"Periodicity features built into a {block.shape} {block.dtype} block")
+        return block, names, index.rename(self.datetime_column)
+
+
+class BlockScaler(BaseEstimator, TransformerMixin):
+    """Min-max scales some columns of a numeric array, in place unless `copy`.
+
+    The array counterpart of the encoder's `MinMaxScaler`, for features built into a
+    single block that must not be copied.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[int] = (),
+        feature_range: tuple[float, float] = (0, 1),
+        copy: bool = True,
+    ) -> None:
+        self.columns = columns
+        self.feature_range = feature_range
+        self.copy = copy
+
+    def fit(self, X, y=None) -> Self:
+        X = np.asarray(X)
+        self.scaler_ = MinMaxScaler(self.feature_range).fit(X[:, list(self.columns)]) if len(self.columns) else None
+        return self
+
+    def transform(self, X) -> np.ndarray:
+        X = np.array(X) if self.copy else np.asarray(X)
+        for i, j in enumerate(self.columns):
+            X[:, j] *= self.scaler_.scale_[i]
+            X[:, j] += self.scaler_.min_[i]
+        return X
@@ -5,6 +5,7 @@ from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
 
 from implementation.data import ColumnNames
 from implementation.estimators import (
+    BlockScaler,
     ColumnTransformerWithNames,
     Imputer,
     Periodicity,
@@ -68,3 +69,17 @@ def get_preprocessing_pipeline(
             ),
         ]
     )
+
+
+def get_block_preprocessing_pipeline(
+    column_names: ColumnNames,
+) -> Pipeline:
+    """Preprocessing for features built by `Periodicity.to_block`, scaling the source
+    numeric columns (the block's first ones) in place."""
+
+    sources = [
+        column
+        for column in column_names.numeric
+        if column not in (column_names.target, column_names.datetime)
+    ]
+    return Pipeline([("scaler", BlockScaler(columns=list(range(len(sources))), copy=False))])
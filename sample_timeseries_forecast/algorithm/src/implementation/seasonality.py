@@ -0,0 +1,153 @@
+import math
+from logging import getLogger
+from typing import Any, Sequence
+
+import numpy as np
+from pandas import Series, to_datetime
+
+from implementation.estimators import PERIODS
+
+logger = getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+
+# Fewest periodogram bins each side of a candidate period that its noise level is taken from
+LOCAL_BINS = 8
+
+
+def periodogram(x: np.ndarray) -> np.ndarray:
+    """Power of every positive frequency `k / len(x)` of the linearly detrended series,
+    index 0 being the mean (removed, so zero)."""
+
+    x = np.asarray(x, dtype=np.float64)
+    t = np.arange(len(x))
+    x = x - np.polyval(np.polyfit(t, x, 1), t)
+    return np.abs(np.fft.rfft(x)) ** 2 / len(x)
+
+
+def residual(seconds: np.ndarray, x: np.ndarray, periods: Sequence[str]) -> np.ndarray:
+    """What is left of `x` after a least-squares fit of a linear trend and of the sine
+    and cosine of every period, the features the model gets besides the lags."""
+
+    t = seconds - seconds[0]
+    columns = [np.ones_like(t), t / max(t[-1], 1)]
+    for name in periods:
+        angle = seconds * 2 * np.pi / (PERIODS[name] * DAY_SECONDS)
+        columns += [np.sin(angle), np.cos(angle)]
+    design = np.column_stack(columns)
+    coefficients, *_ = np.linalg.lstsq(design, x, rcond=None)
+    return x - design @ coefficients
+
+
+def acf(x: np.ndarray, nlags: int) -> np.ndarray:
+    """Autocorrelation at lags `0..nlags`, through the FFT of the zero-padded series."""
+
+    x = np.asarray(x, dtype=np.float64)
+    x = x - x.mean()
+    size = 1 << (2 * len(x) - 1).bit_length()
+    spectrum = np.fft.rfft(x, size)
+    r = np.fft.irfft(spectrum * np.conj(spectrum), size)[: nlags + 1]
+    return r / r[0] if r[0] else np.zeros(nlags + 1)
+
+
+def pacf(r: np.ndarray) -> np.ndarray:
+    """Partial autocorrelation from the autocorrelation `r` (Durbin-Levinson)."""
+
+    nlags = len(r) - 1
+    partial = np.zeros(nlags + 1)
+    partial[0] = 1.0
+    phi = np.zeros(nlags + 1)
+    variance = 1.0
+    for k in range(1, nlags + 1):
+        a = (r[k] - phi[1:k] @ r[k - 1 : 0 : -1]) / variance if variance > 0 else 0.0
+        phi[1:k] = phi[1:k] - a * phi[k - 1 : 0 : -1]
+        phi[k] = a
+        variance *= 1 - a * a
+        partial[k] = a
+    return partial
+
+
+def local_noise(power: np.ndarray, peak: slice, width: int = LOCAL_BINS) -> float:
+    """Mean periodogram ordinate of the noise around the `peak` bins.
+
+    Autocorrelated noise has a coloured spectrum (AR noise piles up at low frequencies),
+    so the level is estimated from the octave either side of the peak, widened to at
+    least `width` bins each side, leaving out the peak and its neighbours. Ordinates of
+    noise are exponential around that level; their median is robust to other peaks.
+    """
+
+    low = max(0, min(peak.start // 2, peak.start - width))
+    high = min(len(power), max(2 * peak.stop, peak.stop + width))
+    band = np.concatenate([power[low : max(0, peak.start - 1)], power[peak.stop + 1 : high]])
+    if not len(band):
+        return 0.0
+    return float(np.median(band) / math.log(2))
+
+
+def select_features(
+    datetimes: Series,
+    target: Series,
+    periods: Sequence[str] = tuple(PERIODS),
+    max_lags: int = 10,
+    alpha: float = 0.01,
+) -> dict[str, Any]:
+    """Chooses the periodicity and lag features the target actually shows.
+
+    A period is kept when the periodogram of the detrended target peaks at its frequency
+    above the noise level around it (Bonferroni-corrected at `alpha` over all
+    frequencies), so noise with more power at low frequencies is not taken for a period;
+    periods shorter than two samples or longer than half the series cannot be resolved
+    and are dropped. Once the trend and the kept periods are removed from the target,
+    the lags are `1..k` for the first `k` (up to `max_lags`) whose partial
+    autocorrelations are all outside the 95% band of white noise; a lone spike further
+    out is more likely chance than structure.
+
+    Returns the selection and the statistics behind it.
+    """
+
+    order = np.argsort(to_datetime(datetimes).to_numpy(), kind="stable")
+    seconds = to_datetime(datetimes).to_numpy()[order].astype("datetime64[ns]").astype(np.int64) / 1e9
+    x = np.asarray(target, dtype=np.float64)[order]
+    mask = np.isfinite(x)
+    x, seconds = x[mask], seconds[mask]
+    n = len(x)
+    if n < 8:
+        raise ValueError(f"Not enough rows ({n}) to select features")
+
+    sampling = float(np.median(np.diff(seconds)))
+    power = periodogram(x)[1:]
+    # Bonferroni-corrected quantile of an exponential ordinate, in units of its mean
+    quantile = math.log(len(power) / alpha)
+
+    report: dict[str, Any] = {}
+    selected = []
+    for name in periods:
+        samples = PERIODS[name] * DAY_SECONDS / sampling
+        if not 2 <= samples <= n / 2:
+            report[name] = {"samples": round(samples, 3), "significant": False, "reason": "not resolvable"}
+            continue
+        # Bins either side of the period's (fractional) frequency
+        k = n / samples
+        peak = slice(max(0, math.floor(k) - 1), math.ceil(k))
+        noise = local_noise(power, peak)
+        ratio = float(power[peak].max() / (noise * quantile)) if noise else 0.0
+        report[name] = {"samples": round(samples, 3), "power_ratio": round(ratio, 3), "significant": ratio >= 1}
+        if ratio >= 1:
+            selected.append(name)
+
+    # Periodicity drops lags * (lags + 1) / 2 rows, keep most of the series
+    max_lags = min(max_lags, int((math.sqrt(1 + 4 * n) - 1) / 2))
+    partial = pacf(acf(residual(seconds, x, selected), max_lags))
+    band = 1.96 / math.sqrt(n)
+    inside = np.flatnonzero(np.abs(partial[1:]) <= band)
+    lags = int(inside[0]) if len(inside) else max_lags
+
+    logger.info(f"Selected periodicity {selected} and {lags} lags (sampling every {sampling:.0f}s)")
+    return {
+        "periodicity": selected,
+        "lags": lags,
+        "sampling_seconds": sampling,
+        "periods": report,
+        "pacf": [round(float(value), 4) for value in partial[1:]],
+        "pacf_band": round(band, 4),
+    }
@@ -1,27 +1,34 @@
 from dataclasses import dataclass
 from logging import getLogger
 from pathlib import Path
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 
+import numpy as np
 from pandas import DataFrame, Series
 from sklearn.base import TransformerMixin
 from sklearn.metrics import get_scorer
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline, make_pipeline
 
+from implementation.bootstrap import bootstrap_intervals
 from implementation.data import ColumnNames, InputParameters, Periodicity
 from implementation.preprocess import (
+    get_block_preprocessing_pipeline,
     get_preprocessing_pipeline,
     get_timeseries_pipeline,
 )
+from implementation.seasonality import select_features
 
 logger = getLogger(__name__)
 
 
 @dataclass
 class WindowGenerator:
-    df: DataFrame
+    df: Optional[DataFrame]
     params: InputParameters
+    lean: bool = False
+    """Builds the features into one float32 array split chronologically into views,
+    instead of copying the DataFrame at every step. Needs numeric features only."""
 
     def __post_init__(
         self,
@@ -32,18 +39,50 @@ class WindowGenerator:
             categorical=list(self.df.select_dtypes(include="object").columns),
             numeric=list(self.df.select_dtypes(include="number").columns),
         )
+        self.feature_names: Optional[List[str]] = None
+        self._figure = None
+
+        # Periodicity and lags to build, the configured ones unless selected from the data
+        self.periodicity: List[Periodicity] = list(self.params.dataset.periodicity or [])
+        self.lags = self.params.dataset.lags
+        self.selection: Optional[dict] = None
+        if self.params.dataset.auto_features:
+            self._select_features()
+
+        features = set(self.df.columns) - {self.column_names.datetime}
+        if self.lean and not features <= set(self.column_names.numeric):
+            logger.warning(
+                f"Memory-lean mode needs numeric features, got {sorted(features)}; "
+                "using the default mode"
+            )
+            self.lean = False
 
         # Timeseries features pipeline, to apply to the whole data
         self.timeseries_pipeline = get_timeseries_pipeline(
             column_names=self.column_names,
-            periodicity=[p.value for p in self.params.dataset.periodicity],
-            lags=self.params.dataset.lags,
+            periodicity=[p.value for p in self.periodicity],
+            lags=self.lags,
         )
 
         # Preprocessing pipeline, to apply to the training features
-        self.preprocessing_pipeline = get_preprocessing_pipeline(
-            column_names=self.column_names,
+        self.preprocessing_pipeline = (
+            get_block_preprocessing_pipeline(column_names=self.column_names)
+            if self.lean
+            else get_preprocessing_pipeline(column_names=self.column_names)
+        )
+
+    def _select_features(self) -> None:
+        """Keeps only the periods and lags the target shows, the configured ones being
+        the candidates (all periods and up to 10 lags if not configured)."""
+
+        self.selection = select_features(
+            self.df[self.column_names.datetime],
+            self.df[self.column_names.target],
+            periods=[p.value for p in self.periodicity] or [p.value for p in Periodicity],
+            max_lags=self.lags if self.lags is not None else 10,
         )
+        self.periodicity = [Periodicity.from_str(p) for p in self.selection["periodicity"]]
+        self.lags = self.selection["lags"]
 
     def preprocess(
         self,
@@ -55,14 +94,17 @@ class WindowGenerator:
         1. Train the preprocessing pipeline on the training data.
         """
 
+        if self.lean:
+            return self._preprocess_block()
+
         # Add time periodicity features to the training data
         self.df = self.timeseries_pipeline.fit_transform(self.df)
         logger.info(
             f"After timeseries feature adding data shape: {self.df.shape}, head: \n{self.df.head()}"
         )
 
-        if self.params.dataset.periodicity:
-            self.inspect_timedata(self.df, self.params.dataset.periodicity)
+        if self.periodicity:
+            self.inspect_timedata(self.df, self.periodicity)
 
         # Split the data into training and testing sets
         X_train, X_test, y_train, y_test = train_test_split(
@@ -77,6 +119,38 @@ class WindowGenerator:
 
         return X_train, X_test, y_train, y_test
 
+    def _preprocess_block(self) -> List:
+        """`preprocess` in memory-lean mode.
+
+        The features are written into a single float32 array, the input DataFrame is
+        released, and the train/test split is chronological so both sets (and their
+        targets) are views of that array. Preprocessing scales them in place.
+        """
+
+        periodicity = self.timeseries_pipeline.named_steps["periodicity"]
+        block, names, index = periodicity.to_block(self.df)
+        # Nothing else needs the input from here on
+        self.df = None
+        self.feature_names = names[:-1]
+        logger.info(f"After timeseries feature adding data shape: {block.shape}")
+
+        if self.periodicity:
+            columns = [i for i, name in enumerate(names) if name.endswith(("_sin", "_cos"))]
+            head = DataFrame(block[:50, columns], columns=[names[i] for i in columns], index=index[:50])
+            self.inspect_timedata(head, self.periodicity)
+        del index
+
+        split = int(len(block) * self.params.dataset.split)
+        X_train, X_test = block[:split, :-1], block[split:, :-1]
+        y_train, y_test = block[:split, -1], block[split:, -1]
+        logger.info(f"Train shape: {X_train.shape} - Test shape: {X_test.shape}")
+
+        self.preprocessing_pipeline.fit(X_train)
+        self.preprocessing_pipeline.transform(X_train)
+        self.preprocessing_pipeline.transform(X_test)
+
+        return X_train, X_test, y_train, y_test
+
     def train(
         self,
         X_train: DataFrame,
@@ -97,9 +171,20 @@ class WindowGenerator:
         X_test: DataFrame,
         y_true: Series,
         metrics: Sequence[str],
-    ) -> float:
-        y_pred = trained_model.predict(X_test.to_numpy())
+        bootstrap: Optional[int] = None,
+        confidence: float = 0.95,
+        block_size: Optional[int] = None,
+    ) -> dict[str, float]:
+        """Scores the predictions for `X_test` with every metric.
+
+        With `bootstrap` resamples, also adds the `confidence` interval of each metric as
+        `<metric>_low` and `<metric>_high`, from a block bootstrap of the test rows in
+        time order.
+        """
+
+        y_pred = trained_model.predict(np.asarray(X_test))
         results = {}
+        score_funcs = {}
 
         for metric in metrics:
             try:
@@ -110,10 +195,30 @@ class WindowGenerator:
 
             try:
                 results[metric] = scorer._score_func(y_true, y_pred)
+                score_funcs[metric] = scorer._score_func
             except Exception as e:
                 logger.error(f"Error calculating metric {metric}: {e}")
                 continue
 
+        if bootstrap and score_funcs:
+            # The default mode's split is shuffled, blocks must follow the timeline
+            order = (
+                np.argsort(y_true.index.to_numpy(), kind="stable")
+                if isinstance(y_true, Series)
+                else slice(None)
+            )
+            intervals = bootstrap_intervals(
+                np.asarray(y_true)[order],
+                np.asarray(y_pred)[order],
+                score_funcs,
+                resamples=bootstrap,
+                confidence=confidence,
+                block_size=block_size,
+            )
+            for metric, (low, high) in intervals.items():
+                results[f"{metric}_low"] = low
+                results[f"{metric}_high"] = high
+
         logger.info(f"Resulting metrics: {results}")
 
         return results
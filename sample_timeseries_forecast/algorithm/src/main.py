@@ -9,14 +9,21 @@
 # This step is not needed if this file contains the whole implementation of your algorithm, in which case
 # you could use the `python-monolith` version.
 import sys
+import time
 
 sys.path.append("/algorithm/src")
 # ======
 
+# Everything from here on is what a fresh process pays before its first job
+_STARTED = time.perf_counter()
+
+import argparse
 import logging
+import os
 from pathlib import Path
 
-from implementation.algorithm import Algorithm
+from implementation.algorithm import Algorithm, registry
+from implementation.daemon import Daemon, Spool
 from implementation.data import InputParameters
 from oceanprotocol_job_details.config import config
 from oceanprotocol_job_details.job_details import OceanProtocolJobDetails
@@ -35,16 +42,42 @@ def main() -> None:
     logger.info("Starting compute job with the following input information:")
     algorithm = Algorithm(job_details)
 
+    failed = False
     try:
         algorithm.run()
     except Exception as e:
+        failed = True
         logger.exception(f"An error occurred while running the algorithm: {e}")
 
     try:
         algorithm.save_result(Path(config.path_outputs))
     except Exception as e:
+        failed = True
         logger.exception(f"An error occurred while saving the results: {e}")
 
+    # Whatever could be saved is kept, but the job (and its daemon report) shows it failed
+    if failed:
+        sys.exit(1)
+
+
+def serve(spool: Path) -> None:
+    """Runs every job submitted to `spool` in a child of this warmed-up process."""
+
+    registry()
+    Daemon(
+        Spool(spool),
+        main,
+        cold_start_seconds=time.perf_counter() - _STARTED,
+        max_jobs=int(os.getenv("DAEMON_JOBS", 1)),
+        job_timeout=float(os.environ["DAEMON_JOB_TIMEOUT"]) if os.getenv("DAEMON_JOB_TIMEOUT") else None,
+    ).serve()
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--daemon", metavar="SPOOL", default=os.getenv("DAEMON_SPOOL"))
+    args = parser.parse_args()
+    if args.daemon:
+        serve(Path(args.daemon))
+    else:
+        main()
@@ -98,3 +98,63 @@ def test_can_predict(tmp_path):
         raise Exception("Error predicting") from e
 
     assert predictions is not None
+
+
+def test_reads_every_file(tmp_path):
+    from types import SimpleNamespace
+
+    import pandas as pd
+
+    df = algorithm._df
+
+    # The sample split into shards over two DIDs, out of chronological order
+    shards = {"did-b": [df.iloc[:100], df.iloc[250:]], "did-a": [df.iloc[100:250]]}
+    files = []
+    for did, parts in shards.items():
+        (tmp_path / did).mkdir()
+        paths = []
+        for i, part in enumerate(parts):
+            part.to_csv(tmp_path / did / str(i))
+            paths.append(tmp_path / did / str(i))
+        files.append(SimpleNamespace(did=did, input_files=paths))
+    (tmp_path / "did-a" / "broken").write_bytes(b"\x00\xff")
+    files[1].input_files.append(tmp_path / "did-a" / "broken")
+
+    sharded = Algorithm(
+        SimpleNamespace(
+            files=SimpleNamespace(files=files),
+            input_parameters=job_details.input_parameters,
+        )
+    )
+    combined = sharded._df
+
+    # Same rows, index and order as reading the whole file
+    expected = df.sort_values("Date", key=pd.to_datetime, kind="stable")
+    pd.testing.assert_frame_equal(combined, expected)
+    statuses = {(r.did, r.file): r.status for r in sharded.file_reports}
+    assert statuses == {
+        ("did-b", "0"): "ok",
+        ("did-b", "1"): "ok",
+        ("did-a", "0"): "ok",
+        ("did-a", "broken"): "failed",
+    }
+
+
+def test_auto_features_recorded(tmp_path):
+    import json
+    from dataclasses import replace
+    from types import SimpleNamespace
+
+    parameters = job_details.input_parameters
+    auto = Algorithm(
+        SimpleNamespace(
+            files=job_details.files,
+            input_parameters=replace(parameters, dataset=replace(parameters.dataset, auto_features=True)),
+        )
+    ).run()
+    auto.save_result(tmp_path)
+
+    saved = json.loads((tmp_path / "parameters.json").read_text())
+    assert saved["dataset"]["auto_features"] is True
+    assert saved["selection"]["periodicity"] == ["week"]
+    assert saved["selection"]["lags"] == auto.window.lags
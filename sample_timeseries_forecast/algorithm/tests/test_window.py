@@ -0,0 +1,191 @@
+import sys
+import tracemalloc
+import warnings
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+import pandas as pd
+from pytest import mark
+from src.implementation.data import DatasetParameters, InputParameters, ModelParameters, Periodicity
+from src.implementation.estimators import Periodicity as PeriodicityFeatures
+from src.implementation.window import WindowGenerator
+
+PERIODS = ["day", "week", "month", "year"]
+
+
+def _data(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "Date": pd.date_range("2000-01-01", periods=rows, freq="h").astype(str),
+            "Sales": rng.uniform(1, 100, rows),
+            "Temperature": rng.normal(size=rows),
+        }
+    )
+
+
+def _params() -> InputParameters:
+    return InputParameters(
+        model=ModelParameters(),
+        dataset=DatasetParameters(
+            separator=",",
+            target_column="Sales",
+            datetime_column="Date",
+            split=0.7,
+            lags=3,
+            periodicity=[Periodicity.from_str(p) for p in PERIODS],
+        ),
+    )
+
+
+def test_block_matches_transform():
+    df = _data(500)
+    features = PeriodicityFeatures("Date", "Sales", PERIODS, lags=3)
+
+    expected = features.transform(df)
+    block, names, index = features.to_block(df)
+
+    assert names[-1] == "Sales"
+    assert sorted(names) == sorted(expected.columns)
+    np.testing.assert_allclose(block, expected[names].to_numpy(), rtol=1e-5, atol=1e-5)
+    pd.testing.assert_index_equal(index, expected.index)
+
+
+@mark.parametrize("lags", [0, 1, 3])
+def test_block_matches_transform_with_gaps(lags):
+    df = _data(500)
+    rng = np.random.default_rng(1)
+    df.loc[rng.choice(500, 25, replace=False), "Sales"] = np.nan
+    df.loc[rng.choice(500, 25, replace=False), "Temperature"] = np.nan
+    # Logarithms of -inf and NaN
+    df.loc[[10, 20], "Sales"] = [0, -1]
+    features = PeriodicityFeatures("Date", "Sales", PERIODS, lags=lags)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        expected = features.transform(df)
+    block, names, index = features.to_block(df)
+
+    # Same rows as the default mode, lags taken across the same gaps
+    pd.testing.assert_index_equal(index, expected.index)
+    np.testing.assert_allclose(
+        block, expected[names].to_numpy(dtype=np.float64), rtol=1e-5, atol=1e-5, equal_nan=True
+    )
+
+
+def test_lean_split_is_chronological_views():
+    window = WindowGenerator(_data(1_000), _params(), lean=True)
+    X_train, X_test, y_train, y_test = window.preprocess()
+
+    assert window.df is None
+    assert X_train.dtype == np.float32
+    # Views of the one feature block
+    parts = (X_train, X_test, y_train, y_test)
+    assert all(part.base is not None and part.base is X_train.base for part in parts)
+    assert len(X_train) + len(X_test) == 1_000 - 6
+    # Source features are scaled with the training range
+    np.testing.assert_allclose([X_train[:, 0].min(), X_train[:, 0].max()], [0, 1], atol=1e-6)
+
+
+def test_lean_peak_memory():
+    # Plotting imports are not part of the data's footprint
+    import matplotlib.pyplot  # noqa: F401
+    import seaborn  # noqa: F401
+
+    df = _data(200_000)
+    size = df.memory_usage(deep=True).sum()
+    window = WindowGenerator(df, _params(), lean=True)
+    del df
+
+    tracemalloc.start()
+    try:
+        window.preprocess()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 2 * size
+
+
+def test_block_bootstrap():
+    from sklearn.metrics import mean_absolute_percentage_error, mean_squared_error, r2_score
+
+    from src.implementation.bootstrap import block_starts, bootstrap_intervals, resample_indices
+
+    starts = block_starts(rows=10, resamples=4, block_size=3, rng=np.random.default_rng(0))
+    indices = resample_indices(starts, block_size=3, rows=10)
+    assert indices.shape == (4, 10) and indices.max() < 10
+    # Runs of consecutive rows
+    assert (np.diff(indices[:, :3]) == 1).all()
+
+    rng = np.random.default_rng(1)
+    y_true = np.cumsum(rng.normal(size=5_000))
+    y_pred = y_true + rng.normal(scale=0.5, size=5_000)
+    funcs = {
+        "mse": mean_squared_error,
+        "r2": r2_score,
+        # Not batched, scored one resample at a time
+        "mape": mean_absolute_percentage_error,
+    }
+    intervals = bootstrap_intervals(y_true, y_pred, funcs, resamples=200, n_jobs=2)
+
+    for name, func in funcs.items():
+        low, high = intervals[name]
+        assert low < func(y_true, y_pred) < high
+    assert intervals == bootstrap_intervals(y_true, y_pred, funcs, resamples=200, n_jobs=1)
+
+
+def test_auto_features():
+    from src.implementation.seasonality import acf, pacf
+
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=50)
+    centered = x - x.mean()
+    expected = [centered[: 50 - k] @ centered[k:] / (centered @ centered) for k in range(6)]
+    np.testing.assert_allclose(acf(x, 5), expected)
+    # AR(1): only the first partial autocorrelation remains
+    np.testing.assert_allclose(pacf(0.5 ** np.arange(5)), [1, 0.5, 0, 0, 0], atol=1e-12)
+
+    # Daily trend, weekly seasonality and AR(2) noise
+    rows = 2_000
+    noise = rng.normal(size=rows)
+    for t in range(2, rows):
+        noise[t] += 0.6 * noise[t - 1] - 0.3 * noise[t - 2]
+    t = np.arange(rows)
+    df = pd.DataFrame(
+        {
+            "Date": pd.date_range("2000-01-01", periods=rows, freq="D").astype(str),
+            "Sales": 50 + 0.01 * t + 5 * np.sin(2 * np.pi * t / 7) + noise,
+        }
+    )
+    params = _params()
+    params.dataset.auto_features = True
+    params.dataset.lags = 10
+    window = WindowGenerator(df, params)
+
+    assert window.selection["periodicity"] == ["week"]
+    assert window.selection["lags"] == 2
+    assert window.selection["periods"]["day"]["reason"] == "not resolvable"
+    assert [p.value for p in window.periodicity] == ["week"]
+    X_train, *_ = window.preprocess()
+    assert X_train.shape[1] == 1 + 3 * 2 + 2
+
+
+def test_auto_features_ar_noise():
+    from src.implementation.seasonality import select_features
+
+    # AR(2) noise has more power at low frequencies, but no period: month must not be kept
+    for seed, (phi1, phi2) in [(2, (0.6, -0.3)), (0, (1.2, -0.3))]:
+        rng = np.random.default_rng(seed)
+        rows = 5_000
+        noise = rng.normal(size=rows)
+        for t in range(2, rows):
+            noise[t] += phi1 * noise[t - 1] + phi2 * noise[t - 2]
+        t = np.arange(rows)
+        dates = pd.Series(pd.date_range("2000-01-01", periods=rows, freq="D").astype(str))
+        selection = select_features(dates, pd.Series(50 + 0.01 * t + noise), max_lags=10)
+
+        assert "month" not in selection["periodicity"]
+        assert selection["periodicity"] == []
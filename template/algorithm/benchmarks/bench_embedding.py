@@ -0,0 +1,128 @@
+"""Benchmarks the ingest -> chunk -> embed -> save path against a local fake Ollama.
+
+Each corpus size runs in a fresh process so its peak memory is measured on its own.
+Latencies are the service times the fake server saw for each embedding request.
+
+Run from `template/algorithm`:
+
+    python benchmarks/bench_embedding.py --sizes 1000 10000 100000 --latency 0.01
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Append relative src directory to path
+sys.path.append("src")
+sys.path.append(".")
+
+import numpy as np
+from implementation.algorithm import Algorithm
+from tests.fake_ollama import FakeOllama
+
+WORDS = (
+    "meeting schedule contract energy trading desk forward price gas power deal "
+    "counterparty credit report risk portfolio position volume settlement invoice "
+    "pipeline capacity regulatory filing attached please review thanks regards"
+).split()
+
+
+def synthetic_corpus(path: Path, rows: int, duplicates: float, seed: int = 0) -> None:
+    """Writes `rows` email-like JSON lines records, a fraction of them exact repeats."""
+
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        previous: list[str] = []
+        for i in range(rows):
+            if previous and rng.random() < duplicates:
+                f.write(previous[rng.integers(len(previous))])
+                continue
+            body = " ".join(rng.choice(WORDS, size=int(rng.integers(20, 400))))
+            line = json.dumps({"id": i, "subject": " ".join(rng.choice(WORDS, 5)), "body": body}) + "\n"
+            previous.append(line)
+            f.write(line)
+
+
+def run(args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "corpus.jsonl"
+        synthetic_corpus(corpus, args.run, args.duplicates)
+
+        with FakeOllama(
+            dimension=args.dim,
+            latency=args.latency,
+            per_token=args.per_token,
+            jitter=args.jitter,
+            failure_rate=args.failure_rate,
+        ) as server:
+            job_details = SimpleNamespace(
+                files=SimpleNamespace(files=[SimpleNamespace(input_files=[corpus])]),
+                parameters={
+                    "base_url": server.url,
+                    "output_dir": tmp,
+                    "output_format": args.format,
+                    "chunk_workers": args.workers,
+                },
+            )
+            start = time.perf_counter()
+            algorithm = Algorithm(job_details).run()
+            seconds = time.perf_counter() - start
+
+        latencies = np.array(server.latencies) * 1000
+        return {
+            "records": args.run,
+            "chunks": algorithm.results["source_rows"],
+            "requests": len(latencies),
+            "seconds": round(seconds, 3),
+            "records_per_s": round(args.run / seconds, 1),
+            "tokens_per_s": round(server.tokens / seconds, 1),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--per-token", type=float, default=2e-6)
+    parser.add_argument("--jitter", type=float, default=0.002)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--format", default="npy")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        print(json.dumps(run(args)))
+        return
+
+    columns = ["records", "chunks", "requests", "seconds", "records_per_s", "tokens_per_s",
+               "p50_ms", "p99_ms", "peak_rss_mb"]
+    print("".join(f"{column:>14}" for column in columns))
+    for size in args.sizes:
+        argv = [arg for arg in sys.argv[1:]]
+        output = subprocess.run(
+            [sys.executable, __file__, *argv, "--run", str(size)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "PYTHONPATH": os.getcwd()},
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print("".join(f"{str(result[column]):>14}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmarks build time, batched query latency and recall of the vector indexes on
+synthetic clustered embeddings.
+
+Run from `template/algorithm`:
+
+    python benchmarks/bench_index.py --rows 100000 --dim 768
+"""
+
+import argparse
+import sys
+import time
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from implementation.index import build_index
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    noise = rng.normal(scale=0.5, size=(rows, dim)).astype(np.float32)
+    return centers[rng.integers(0, clusters, rows)] + noise
+
+
+def recall(ids: np.ndarray, expected: np.ndarray) -> float:
+    k = expected.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(ids, expected)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dim, clusters=max(8, args.rows // 500))
+    queries = vectors[np.random.default_rng(1).choice(args.rows, args.queries)] + 0.1
+
+    configs = [("exact", {})] + [("ivf", {"nprobe": nprobe}) for nprobe in args.nprobe]
+    expected = None
+
+    print(f"rows={args.rows} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'index':<14}{'build s':>10}{'ms/query':>12}{'recall@k':>10}")
+    for kind, options in configs:
+        start = time.perf_counter()
+        index = build_index(kind, vectors, **options)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ids = np.vstack(
+            [
+                index.search(queries[i : i + args.batch], k=args.k)[0]
+                for i in range(0, args.queries, args.batch)
+            ]
+        )
+        latency = (time.perf_counter() - start) / args.queries * 1000
+
+        if expected is None:
+            expected = ids
+        name = kind + "".join(f" {key}={value}" for key, value in options.items())
+        print(f"{name:<14}{build:>10.2f}{latency:>12.3f}{recall(ids, expected):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
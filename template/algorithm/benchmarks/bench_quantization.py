@@ -0,0 +1,73 @@
+"""Benchmarks the recall / resident memory tradeoff of the quantized indexes against the
+exact float32 index, for several rescoring depths.
+
+Run from `template/algorithm`:
+
+    python benchmarks/bench_quantization.py --rows 100000 --dim 768
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from bench_index import recall, synthetic_vectors
+from implementation.index import build_index, load_index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 4, 10, 50])
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dim, clusters=max(8, args.rows // 500))
+    queries = vectors[np.random.default_rng(1).choice(args.rows, args.queries)] + 0.1
+
+    exact = build_index("exact", vectors)
+    expected = exact.search(queries, k=args.k)[0]
+
+    print(f"rows={args.rows} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'index':<20}{'resident MB':>12}{'reduction':>11}{'ms/query':>10}{'recall@k':>10}")
+    print(f"{'exact':<20}{exact.vectors.nbytes / 2**20:>12.1f}{1:>10}x{'':>10}{1:>10.3f}")
+
+    for kind in ("int8", "binary"):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Reload so the float vectors are memory-mapped, as they are in a job
+            build_index(kind, vectors).save(Path(tmp))
+            index = load_index(Path(tmp))
+
+            for rescore in args.rescore:
+                index.rescore = rescore
+                start = time.perf_counter()
+                ids = np.vstack(
+                    [
+                        index.search(queries[i : i + args.batch], k=args.k)[0]
+                        for i in range(0, args.queries, args.batch)
+                    ]
+                )
+                latency = (time.perf_counter() - start) / args.queries * 1000
+
+                resident = sum(
+                    array.nbytes
+                    for name, array in index._arrays().items()
+                    if name != "vectors"
+                )
+                print(
+                    f"{f'{kind} rescore={rescore}':<20}{resident / 2**20:>12.1f}"
+                    f"{exact.vectors.nbytes / resident:>10.0f}x{latency:>10.3f}"
+                    f"{recall(ids, expected):>10.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmarks reading and parsing inputs from slow storage, with and without read-ahead.
+
+Slow storage is stood in for by a local file whose every read pays a fixed latency plus
+its size over a bandwidth, like a request to a network volume. Each case parses the
+whole file: JSON lines with `json.loads`, CSV with `pandas.read_csv`.
+
+Run from `template/algorithm`:
+
+    python benchmarks/bench_source.py --size-mb 50 --latency 0.002 --bandwidth-mb 200
+"""
+
+import argparse
+import gzip
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+import pandas as pd
+from implementation.source import open_input
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Throttled(io.RawIOBase):
+    """A file whose every read takes `latency + size / bandwidth` seconds."""
+
+    def __init__(self, path: Path, latency: float, bandwidth: float) -> None:
+        self._file = open(path, "rb", buffering=0)
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._file.readinto(buffer)
+        time.sleep(self.latency + count / self.bandwidth)
+        return count
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def write_inputs(directory: Path, size: int) -> dict[str, Path]:
+    rng = np.random.default_rng(0)
+    rows = size // 80
+    frame = pd.DataFrame(
+        {
+            "id": np.arange(rows),
+            "value": rng.normal(size=rows),
+            "text": rng.choice(["alpha", "beta", "gamma", "delta"], size=rows),
+            "when": pd.date_range("2000-01-01", periods=rows, freq="min").astype(str),
+        }
+    )
+    paths = {"csv": directory / "data.csv", "jsonl": directory / "data.jsonl"}
+    frame.to_csv(paths["csv"], index=False)
+    frame.to_json(paths["jsonl"], orient="records", lines=True)
+    for kind in ("csv", "jsonl"):
+        data = paths[kind].read_bytes()
+        paths[f"{kind}.gz"] = directory / f"data.{kind}.gz"
+        paths[f"{kind}.gz"].write_bytes(gzip.compress(data, 6))
+        if zstandard is not None:
+            paths[f"{kind}.zst"] = directory / f"data.{kind}.zst"
+            paths[f"{kind}.zst"].write_bytes(zstandard.ZstdCompressor(level=3).compress(data))
+    return paths
+
+
+def parse(stream: io.BufferedIOBase, kind: str) -> int:
+    if kind.startswith("csv"):
+        return len(pd.read_csv(stream))
+    return sum(1 for line in io.TextIOWrapper(stream, encoding="utf-8") if json.loads(line))
+
+
+def cases(args: argparse.Namespace) -> dict[str, Callable[[Path], io.BufferedIOBase]]:
+    slow = lambda path: Throttled(path, args.latency, args.bandwidth_mb * 2**20)  # noqa
+    return {
+        "slow, direct": lambda path: open_input(path, mode="direct", opener=slow),
+        "slow, read-ahead": lambda path: open_input(path, mode="readahead", opener=slow),
+        "local, direct": lambda path: open_input(path, mode="direct"),
+        "local, read-ahead": lambda path: open_input(path, mode="readahead"),
+        "local, mmap": lambda path: open_input(path, mode="mmap"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--bandwidth-mb", type=float, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(Path(tmp), int(args.size_mb * 2**20))
+
+        columns = ["input", "case", "seconds", "MB/s"]
+        print("".join(f"{column:>20}" for column in columns))
+        for kind, path in paths.items():
+            for name, opener in cases(args).items():
+                start = time.perf_counter()
+                with opener(path) as stream:
+                    parse(stream, kind)
+                seconds = time.perf_counter() - start
+                # Throughput of the uncompressed content
+                size = paths[kind.split(".")[0]].stat().st_size
+                row = [kind, name, f"{seconds:.2f}", f"{size / 2**20 / seconds:.1f}"]
+                print("".join(f"{value:>20}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,41 @@
-import os, sys
-import json, csv
+import os
+import json
+import shutil, tempfile
+import time
 from logging import getLogger
 from pathlib import Path
-from typing import Any, Optional, TypeVar
-import pandas as pd
-import requests
+from typing import Any, Callable, Optional, TypeVar
+import numpy as np
+from oceanprotocol_job_details.config import config
 from oceanprotocol_job_details.ocean import JobDetails
-from langchain_ollama import OllamaEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from implementation.chunking import split_records
+from implementation.dedup import Deduplicator, MinHashLSH
+from implementation.embedding import AdaptiveBatcher, OllamaEmbedder, estimate_tokens
+from implementation.executor import FileExecutor, FileTask, job_files
+from implementation.ingest import iter_records
+from implementation.index import ExactIndex, build_index
+from implementation.metrics import Metrics
+from implementation.output import SOURCE_COLUMNS, VectorWriter, load_embeddings, load_sources
+from implementation.pipeline import Checkpoint, EmbeddingPipeline
+from implementation.startup import ModelWarmup, started_at
 
 T = TypeVar("T")
 logger = getLogger(__name__)
 
+# Parameters that change which rows are written, a checkpoint is only reused if they match
+_ROW_PARAMETERS = (
+    "input_format",
+    "dedup",
+    "near_dedup",
+    "near_dedup_threshold",
+    "near_dedup_mode",
+    "minhash_permutations",
+)
+
+# Memory reserved for embedding one file on top of its size, for admitting files
+_FILE_MEMORY = 128 * 2**20
+
+
 class Algorithm:
     def __init__(self, job_details: JobDetails):
         logger.info("Initializing Algorithm")
@@ -19,6 +43,9 @@ class Algorithm:
         self._job_details = job_details
         logger.info(f"Job details: {self._job_details}")
         self.results: Optional[Any] = None
+        self._output_dir: Optional[Path] = None
+        self._outputs: list[str] = []
+        self.metrics = Metrics(enabled=_flag(os.getenv("METRICS", True)))
 
     def _validate_input(self) -> None:
         logger.info("Validating input files")
@@ -27,129 +54,371 @@ class Algorithm:
             raise ValueError("No files found")
         logger.info("Input validation passed")
 
-    def _ensure_model_available(self, model: str, base_url: str) -> None:
-        logger.info(f"Checking available model tags at {base_url}")
-        resp = requests.get(f"{base_url}/api/tags")
-        resp.raise_for_status()
-        tags = resp.json().get("models", [])
-        full_tags = [t.get("model") for t in tags if isinstance(t, dict)]
-        logger.info(f"Available models before pull: {full_tags}")
-
-        if any(tag == model or tag.startswith(f"{model}:") for tag in full_tags):
-            matched = next(tag for tag in full_tags if tag == model or tag.startswith(f"{model}:"))
-            logger.info(f"Model '{model}' already available as '{matched}'")
-            return
-
-        logger.info(f"Model '{model}' not found; pulling now…")
-        pull_resp = requests.post(
-            f"{base_url}/api/pull",
-            json={"model": model, "stream": True},
-            stream=True
-        )
-        pull_resp.raise_for_status()
-
-        for raw in pull_resp.iter_lines():
-            if not raw:
-                continue
-            line = raw.decode("utf-8", errors="ignore")
-            try:
-                msg = json.loads(line)
-                status = msg.get("status") or msg.get("msg") or msg
-            except:
-                status = line
-            logger.info(f"Pull progress: {status}")
-            if isinstance(msg, dict) and msg.get("status") == "success":
-                logger.info(f"Model '{model}' pulled successfully")
-                break
-
-        # final check
-        resp2 = requests.get(f"{base_url}/api/tags")
-        resp2.raise_for_status()
-        tags2 = resp2.json().get("models", [])
-        full_tags2 = [t.get("model") for t in tags2 if isinstance(t, dict)]
-        if not any(tag == model or tag.startswith(f"{model}:") for tag in full_tags2):
-            logger.error(f"Model '{model}' failed to download")
-            raise RuntimeError(f"Failed to pull Ollama model '{model}'")
-        logger.info(f"Model '{model}' is now available")
-
     def run(self) -> "Algorithm":
+        try:
+            with self.metrics.phase("run"):
+                return self._run()
+        finally:
+            self._write_metrics()
+
+    def _run(self) -> "Algorithm":
         logger.info("Starting algorithm run")
         self.results = {}
         self._validate_input()
 
-        input_files = self._job_details.files.files[0].input_files
-        file_path = Path(input_files[0])
-        logger.info(f"Input file path: {file_path}")
-        if not file_path.exists():
-            file_path = Path.cwd() / file_path
-        ext = file_path.suffix.lower()
-
-        if not ext:
-            # try JSON
-            try:
-                with open(file_path) as f:
-                    data = json.load(f)
-                ext = '.json'
-            except json.JSONDecodeError:
-                # fallback to CSV?
-                try:
-                    with open(file_path) as f:
-                        _ = list(csv.reader(f))
-                    ext = '.csv'
-                except Exception:
-                    raise ValueError(
-                        "Could not auto-detect file type; please supply a .json or .csv file."
-                    )
-        if ext == ".json":
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        elif ext == ".csv":
-            df = pd.read_csv(file_path)
-            data = df.to_dict(orient="records")
-        else:
-            raise ValueError(f"Unsupported file type: '{ext}' – only .csv or .json allowed")
-
-        if isinstance(data, list):
-            texts = [
-                json.dumps(record, ensure_ascii=False)
-                for record in data
-            ]
-        elif isinstance(data, dict):
-            texts = [json.dumps(data, ensure_ascii=False)]
-        else:
-            raise ValueError("Loaded data must be a list or dict")
-
-        logger.info(f"Prepared {len(texts)} documents for embedding")
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2048,
-            chunk_overlap=200
-        )
-        all_chunks: list[str] = []
-        for t in texts:
-            all_chunks.extend(splitter.split_text(t))
-        texts = all_chunks
-        logger.info(f"After chunking: {len(texts)} pieces to embed")
-
         params = getattr(self._job_details, "parameters", {}) or {}
+        if "metrics" in params:
+            self.metrics.enabled = _flag(params["metrics"])
         embed_model = params.get("embed_model", "nomic-embed-text")
         base_url   = params.get("base_url") or os.getenv("BASE_URL", "http://localhost:11434")
+        keep_alive = params.get("keep_alive") or os.getenv("OLLAMA_KEEP_ALIVE", "30m")
         logger.info(f"Embedding model={embed_model}, base_url={base_url}")
 
-        self._ensure_model_available(embed_model, base_url)
+        # Waiting for Ollama, pulling and loading the model run in the background while
+        # the input is read and chunked; only the first embedding call waits for them
+        warmup = ModelWarmup(
+            embed_model,
+            base_url,
+            keep_alive=keep_alive,
+            timeout=float(params.get("startup_timeout") or os.getenv("STARTUP_TIMEOUT", 600)),
+        ).start()
+
+        tasks = job_files(self._job_details.files)
+        if not tasks:
+            raise ValueError("No input files found")
+        output_dir = self._prepare_output_dir(params)
 
-        embeddings_client = OllamaEmbeddings(model=embed_model, base_url=base_url)
-        vectors = embeddings_client.embed_documents(texts)
+        # Every file of every DID is embedded, several at a time; the CPUs for chunking
+        # are shared between them
+        file_workers = params.get("file_workers") or os.getenv("FILE_WORKERS")
+        executor = FileExecutor(
+            workers=int(file_workers) if file_workers is not None else None,
+            cost=lambda task: _FILE_MEMORY + task.size,
+        )
+        workers = min(executor.workers, len(tasks))
+        chunk_workers = params.get("chunk_workers") or os.getenv("CHUNK_WORKERS")
+        chunk_workers = (
+            int(chunk_workers) if chunk_workers is not None
+            else max(1, (os.cpu_count() or 1) // workers)
+        )
+        logger.info(f"Embedding {len(tasks)} files, {workers} at a time")
+
+        def embed_file(task: FileTask) -> tuple[dict, list[str]]:
+            # A single file keeps the flat output layout
+            directory = output_dir if len(tasks) == 1 else output_dir / task.did / task.path.name
+            directory.mkdir(parents=True, exist_ok=True)
+            return self._embed_file(task.path, directory, params, warmup, chunk_workers)
+
+        reports = executor.map(embed_file, tasks)
+
+        for report in reports:
+            if report.status == "ok":
+                manifest, _ = report.value
+                report.details = {key: manifest[key] for key in ("rows", "source_rows", "records")}
+        with open(output_dir / "files.json", "w", encoding="utf-8") as f:
+            json.dump([report.to_dict() for report in reports], f, indent=2)
 
-        self.results = vectors
+        if len(tasks) == 1:
+            self.results, self._outputs = reports[0].value or ({}, [])
+        else:
+            self.results = {"files": [report.to_dict() for report in reports]}
+            self._outputs = sorted({task.did for task in tasks})
+        self._outputs.append("files.json")
+        self._record_job_metrics(warmup)
+        self._record_output_bytes()
+
+        if all(report.status == "failed" for report in reports):
+            raise RuntimeError(f"Every input file failed, first error: {reports[0].error}")
         logger.info("Algorithm run completed")
         return self
 
+    def _embed_file(
+        self,
+        file_path: Path,
+        output_dir: Path,
+        params: dict,
+        warmup: ModelWarmup,
+        chunk_workers: int,
+    ) -> tuple[dict, list[str]]:
+        """Embeds one input file into `output_dir`; returns its manifest and output names."""
+
+        logger.info(f"Input file path: {file_path}")
+        embed_model = params.get("embed_model", "nomic-embed-text")
+        base_url   = params.get("base_url") or os.getenv("BASE_URL", "http://localhost:11434")
+        batch_size = int(params.get("batch_size") or os.getenv("EMBED_BATCH_SIZE", 256))
+        context_length = int(
+            params.get("context_length") or os.getenv("OLLAMA_CONTEXT_LENGTH", 2048)
+        )
+        # Chunks are measured in (estimated) tokens so they fill, but never exceed, the
+        # model's context
+        chunk_tokens = int(params.get("chunk_tokens") or context_length)
+        chunk_overlap = int(params.get("chunk_overlap", 200))
+        dedup = self._deduplicator(params)
+
+        # Records are read lazily and flow straight into the chunker, so only the
+        # current batch of chunks is held in memory
+        records = iter_records(file_path, params.get("input_format"))
+
+        output_format = params.get("output_format") or os.getenv("OUTPUT_FORMAT", "json")
+        output_dtype = params.get("output_dtype") or os.getenv("OUTPUT_DTYPE", "float32")
+
+        # Progress is checkpointed next to the outputs so a restarted job resumes from the
+        # last committed batch instead of embedding everything again
+        checkpoint = Checkpoint(
+            output_dir / "checkpoint.json",
+            Checkpoint.fingerprint_of(
+                file_path,
+                embed_model=embed_model,
+                output_format=output_format,
+                output_dtype=output_dtype,
+                chunk_tokens=chunk_tokens,
+                chunk_overlap=chunk_overlap,
+                **{key: params.get(key) for key in _ROW_PARAMETERS},
+            ),
+        )
+        state = checkpoint.load() if _flag(params.get("resume", True)) else None
+
+        # Vectors are written as each batch comes back instead of being kept in memory
+        writer = VectorWriter(
+            output_dir,
+            format=output_format,
+            dtype=output_dtype,
+            resume=state["writer"] if state else None,
+        )
+        # Requests are packed up to a token budget that adapts to the server's throughput
+        token_budget = params.get("token_budget") or os.getenv("EMBED_TOKEN_BUDGET")
+        batcher = AdaptiveBatcher(
+            OllamaEmbedder(
+                embed_model,
+                base_url,
+                context_length,
+                keep_alive=warmup.keep_alive,
+                metrics=self.metrics,
+            ),
+            context_length,
+            budget=int(token_budget) if token_budget is not None else None,
+            max_texts=batch_size,
+            metrics=self.metrics,
+        )
+        embed = self._gated(batcher, warmup)
+        pipeline = EmbeddingPipeline(
+            embed,
+            writer,
+            dedup,
+            batch_size=batch_size,
+            token_budget=batcher.token_budget,
+            checkpoint=checkpoint,
+            checkpoint_every=int(params.get("checkpoint_every", 10)),
+            metrics=self.metrics,
+        )
+        self.metrics.count("checkpoint.resumed_rows", writer.rows)
+
+        chunks = split_records(
+            records,
+            chunk_size=chunk_tokens,
+            chunk_overlap=chunk_overlap,
+            length_function=estimate_tokens,
+            workers=chunk_workers,
+        )
+        try:
+            with self.metrics.phase("pipeline"):
+                n_records = pipeline.run(chunks)
+        finally:
+            with self.metrics.phase("close"):
+                manifest = writer.close(
+                    records=pipeline.records,
+                    dedup=dedup.report(),
+                    batching=batcher.report(),
+                    startup=warmup.timings,
+                )
+            self.metrics.count("dedup.chunks", manifest["dedup"]["chunks"])
+            self.metrics.count("dedup.saved", manifest["dedup"]["saved"])
+        checkpoint.clear()
+        outputs = [manifest["embeddings"], manifest["sources"], "manifest.json"]
+
+        logger.info(f"Embedded {writer.rows} pieces from {n_records} documents")
+
+        index_kind = params.get("index") or os.getenv("INDEX")
+        queries = params.get("query")
+        if index_kind or queries:
+            # Queries need an index; an exact one is built if none was requested
+            with self.metrics.phase("index"):
+                index = self._build_index(index_kind or "exact", params, output_dir, manifest)
+            outputs.append("index")
+            if queries:
+                with self.metrics.phase("query"):
+                    self._query(index, queries, embed, params, output_dir, manifest)
+                outputs.append("query_results.json")
+        return manifest, outputs
+
+    @staticmethod
+    def _gated(embed: Callable[[list[str]], T], warmup: ModelWarmup) -> Callable[[list[str]], T]:
+        """Waits for the model before the first embedding call and logs when it returned."""
+
+        first = True
+
+        def gated(texts: list[str]) -> T:
+            nonlocal first
+            if not first:
+                return embed(texts)
+
+            warmup.wait()
+            vectors = embed(texts)
+            first = False
+            # Files embedded concurrently share the warm-up; the earliest one counts
+            if "first_embedding" not in warmup.timings:
+                warmup.timings["first_embedding"] = round(time.time() - started_at(), 3)
+                logger.info(
+                    f"Startup: first embedding at {warmup.timings['first_embedding']}s "
+                    "since container start"
+                )
+            return vectors
+
+        return gated
+
+    def _record_job_metrics(self, warmup: ModelWarmup) -> None:
+        chunks = self.metrics.counters.get("dedup.chunks")
+        if chunks:
+            # Chunks answered without an embedding request
+            self.metrics.gauge("dedup.hit_rate", self.metrics.counters["dedup.saved"] / chunks)
+        for name, seconds in warmup.timings.items():
+            self.metrics.gauge("startup.seconds", seconds, step=name)
+
+    def _record_output_bytes(self) -> None:
+        for name in self._outputs:
+            path = self._output_dir / name
+            if path.is_dir():
+                size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+            elif path.exists():
+                size = path.stat().st_size
+            else:
+                continue
+            self.metrics.gauge("output.bytes", size, file=name)
+
+    def _write_metrics(self) -> None:
+        """Writes `metrics.json` (and, if enabled, `metrics.prom`) to the logs directory."""
+
+        if not self.metrics.enabled:
+            return
+
+        params = getattr(self._job_details, "parameters", {}) or {}
+        directory = Path(params.get("metrics_dir") or os.getenv("METRICS_DIR") or config.path_logs)
+        if not directory.is_dir():
+            if self._output_dir is None:
+                return
+            directory = self._output_dir
+        try:
+            self.metrics.write(
+                directory,
+                openmetrics=_flag(params.get("openmetrics", os.getenv("METRICS_OPENMETRICS", False))),
+            )
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {directory}: {e}")
+
+    def _deduplicator(self, params: dict) -> Deduplicator:
+        near = None
+        if _flag(params.get("near_dedup", os.getenv("NEAR_DEDUP", False))):
+            near = MinHashLSH(
+                threshold=float(params.get("near_dedup_threshold", 0.9)),
+                num_perm=int(params.get("minhash_permutations", 128)),
+            )
+            logger.info(
+                f"Near-duplicate detection enabled: threshold={near.threshold}, "
+                f"bands={near.bands}x{near.rows}"
+            )
+
+        return Deduplicator(
+            enabled=_flag(params.get("dedup", True)),
+            near=near,
+            near_mode=params.get("near_dedup_mode", "skip"),
+        )
+
+    def _build_index(
+        self, kind: str, params: dict, output_dir: Path, manifest: dict
+    ) -> ExactIndex:
+        logger.info(f"Building {kind} index")
+        index = build_index(
+            kind,
+            load_embeddings(output_dir, manifest),
+            nlist=params.get("index_nlist"),
+            nprobe=int(params.get("index_nprobe", 8)),
+            rescore=int(params.get("index_rescore", 4)),
+        )
+        index.save(output_dir / "index")
+        return index
+
+    def _query(
+        self,
+        index: ExactIndex,
+        queries: Any,
+        embed: Callable,
+        params: dict,
+        output_dir: Path,
+        manifest: dict,
+    ) -> None:
+        """Embeds the queries and writes their top-k chunks to `query_results.json`."""
+
+        queries = [queries] if isinstance(queries, str) else list(queries)
+        top_k = int(params.get("top_k", 5))
+        batch_size = int(params.get("batch_size") or os.getenv("EMBED_BATCH_SIZE", 256))
+
+        # Each embedding row is reported with the first chunk that produced it
+        sources = load_sources(output_dir, manifest)
+        rows, first = np.unique(sources[:, SOURCE_COLUMNS.index("row")], return_index=True)
+        source_of = dict(zip(rows.tolist(), sources[first, :3].tolist()))
+
+        results = []
+        for start in range(0, len(queries), batch_size):
+            batch = queries[start:start + batch_size]
+            ids, scores = index.search(embed(batch), k=top_k)
+            for query, query_ids, query_scores in zip(batch, ids.tolist(), scores.tolist()):
+                results.append({
+                    "query": query,
+                    "results": [
+                        dict(
+                            row=row,
+                            score=score,
+                            **dict(zip(SOURCE_COLUMNS[:3], source_of.get(row, []))),
+                        )
+                        for row, score in zip(query_ids, query_scores)
+                        if row >= 0
+                    ],
+                })
+
+        with open(output_dir / "query_results.json", "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        logger.info(f"Answered {len(queries)} queries with top-{top_k} chunks")
+
+    def _prepare_output_dir(self, params: dict) -> Path:
+        """Chooses where embeddings are streamed to while the job runs.
+
+        Writing straight into the outputs directory avoids a copy in `save_result`; when it
+        is not available (e.g. local runs) a temporary directory is used instead.
+        """
+        output_dir = params.get("output_dir") or config.path_outputs
+        if output_dir and Path(output_dir).is_dir():
+            self._output_dir = Path(output_dir)
+        else:
+            self._output_dir = Path(tempfile.mkdtemp(prefix="embeddings-"))
+        return self._output_dir
+
     def save_result(self, path: Path) -> None:
-        result_path = path / "result.json"
-        logger.info(f"Saving result to {result_path}")
-        with open(result_path, "w", encoding="utf-8") as f:
-            json.dump(self.results, f, indent=2, ensure_ascii=False)
+        logger.info(f"Saving result to {path}")
+        if self._output_dir is None:
+            raise RuntimeError("No results to save; run the algorithm first")
+
+        path.mkdir(parents=True, exist_ok=True)
+        with self.metrics.phase("save_result"):
+            if self._output_dir.resolve() != path.resolve():
+                for name in self._outputs:
+                    if (self._output_dir / name).exists():
+                        shutil.move(str(self._output_dir / name), str(path / name))
+        self._write_metrics()
         logger.info("Result saved successfully")
-        logger.info("Triggering self-destruct; stopping container…")
-        sys.exit(0)
+
+
+def _flag(value: Any) -> bool:
+    """Reads a boolean parameter that may come as a string from the environment or JSON."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
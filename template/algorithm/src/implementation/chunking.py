@@ -0,0 +1,104 @@
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from logging import getLogger
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+logger = getLogger(__name__)
+
+# A chunk of text and its (record, chunk, offset) position in the input
+Chunk = tuple[str, tuple[int, int, int]]
+
+# Records sent to a worker per task, to amortize the inter-process overhead
+TASK_SIZE = 64
+
+# Workers are started from a clean server process: the pool is created while reader,
+# embedding and warmup threads run, and forking them could copy a held lock
+START_METHOD = "forkserver"
+
+# The worker's splitter, and the size and measure it was built with
+_splitter: Optional[RecursiveCharacterTextSplitter] = None
+_chunk_size = 0
+_length_function: Callable[[str], int] = len
+
+
+def _init_splitter(
+    chunk_size: int, chunk_overlap: int, length_function: Callable[[str], int] = len
+) -> None:
+    global _splitter, _chunk_size, _length_function
+    _chunk_size, _length_function = chunk_size, length_function
+    _splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+        add_start_index=True,
+    )
+
+
+def _split(task: tuple[int, list[Any]]) -> list[Chunk]:
+    """Serializes and splits a run of consecutive records starting at index `first`."""
+
+    first, records = task
+    chunks: list[Chunk] = []
+    for record, data in enumerate(records, start=first):
+        text = json.dumps(data, ensure_ascii=False)
+        # Most records fit one chunk; the splitter would measure every piece of them
+        if _length_function(text) <= _chunk_size:
+            chunks.append((text, (record, 0, 0)))
+            continue
+        for chunk, doc in enumerate(_splitter.create_documents([text])):
+            chunks.append((doc.page_content, (record, chunk, doc.metadata["start_index"])))
+    return chunks
+
+
+def _tasks(records: Iterable[Any]) -> Iterator[tuple[int, list[Any]]]:
+    iterator = iter(records)
+    first = 0
+    while batch := list(islice(iterator, TASK_SIZE)):
+        yield first, batch
+        first += len(batch)
+
+
+def split_records(
+    records: Iterable[Any],
+    chunk_size: int = 2048,
+    chunk_overlap: int = 200,
+    workers: Optional[int] = None,
+    length_function: Callable[[str], int] = len,
+) -> Iterator[Chunk]:
+    """Serializes and splits records into chunks, in input order.
+
+    `chunk_size` and `chunk_overlap` are measured with `length_function`, characters by
+    default; it must be picklable (a module-level function) when a process pool is used.
+
+    With more than one worker the splitting is fanned out across a process pool. Only a
+    bounded number of tasks is in flight at once, so records are still consumed lazily.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        _init_splitter(chunk_size, chunk_overlap, length_function)
+        for task in _tasks(records):
+            yield from _split(task)
+        return
+
+    logger.info(f"Chunking with {workers} worker processes")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(START_METHOD),
+        initializer=_init_splitter,
+        initargs=(chunk_size, chunk_overlap, length_function),
+    ) as executor:
+        pending: deque[Future] = deque()
+        for task in _tasks(records):
+            pending.append(executor.submit(_split, task))
+            if len(pending) >= workers * 4:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
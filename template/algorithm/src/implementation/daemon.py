@@ -0,0 +1,266 @@
+# Copied verbatim into both algorithm trees (template/ and sample_timeseries_forecast/):
+# each is built into its own image from its own directory, so neither can import the
+# other's. Keep the two copies identical; tests/test_shared.py checks it.
+import json
+import os
+import signal
+import sys
+import time
+import traceback
+import uuid
+from dataclasses import fields
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from oceanprotocol_job_details.config import config
+
+logger = getLogger(__name__)
+
+# Descriptor fields the job details loader reads from the environment
+_ENV_FIELDS = {"dids": "DIDS", "transformation_did": "TRANSFORMATION_DID", "secret": "SECRET"}
+
+# Config paths relative to a job's `data` directory, as in the default `/data` layout
+_DATA_LAYOUT = {
+    "path_data": "",
+    "path_inputs": "inputs",
+    "path_ddos": "ddos",
+    "path_outputs": "outputs",
+    "path_logs": "logs",
+    "path_algorithm_custom_parameters": "inputs/algoCustomData.json",
+}
+
+
+class Spool:
+    """A directory of job descriptors moving from `incoming/` to `running/` to `done/`.
+
+    A descriptor is a JSON object with the job's `dids`, `transformation_did` and
+    `secret`, and either a `data` directory laid out like `/data` or single `paths`
+    (`outputs`, `logs`, ...) overriding the defaults; `env` adds environment variables.
+    It must appear in `incoming/` atomically (written elsewhere and renamed, as `submit`
+    does). Claiming renames it into `running/`, so several daemons can share a spool.
+    The report and log of a job end up in `done/<id>.json` and `done/<id>.log`.
+    """
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+        self.incoming = self.root / "incoming"
+        self.running = self.root / "running"
+        self.done = self.root / "done"
+        for directory in (self.incoming, self.running, self.done):
+            directory.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, descriptor: dict[str, Any], job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        partial = self.root / f".{job_id}.json"
+        partial.write_text(json.dumps(descriptor), encoding="utf-8")
+        partial.rename(self.incoming / f"{job_id}.json")
+        return job_id
+
+    def claim(self) -> Optional[tuple[str, dict[str, Any], float]]:
+        """Takes the oldest waiting job; returns its id, descriptor and submission time."""
+
+        for submitted, path in sorted(self._waiting()):
+            claimed = self.running / path.name
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                # Claimed by another daemon in the meantime
+                continue
+            try:
+                descriptor = json.loads(claimed.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.error(f"Invalid job descriptor {path.name}: {e}")
+                self.finish(path.stem, {"id": path.stem, "exit_code": None, "error": str(e)})
+                continue
+            return path.stem, descriptor, submitted
+        return None
+
+    def _waiting(self) -> list[tuple[float, Path]]:
+        """Descriptors in `incoming/` with their submission times, leaving out any another
+        daemon claims while they are listed."""
+
+        waiting = []
+        for path in self.incoming.glob("*.json"):
+            try:
+                waiting.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        return waiting
+
+    def finish(self, job_id: str, report: dict[str, Any]) -> None:
+        log = self.running / f"{job_id}.log"
+        if log.exists():
+            log.rename(self.done / log.name)
+        partial = self.done / f".{job_id}.json"
+        partial.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        partial.rename(self.done / f"{job_id}.json")
+        (self.running / f"{job_id}.json").unlink(missing_ok=True)
+
+    def result(self, job_id: str, timeout: Optional[float] = None, poll: float = 0.05) -> dict[str, Any]:
+        """Waits for the report of a submitted job."""
+
+        path = self.done / f"{job_id}.json"
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not path.exists():
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+            time.sleep(poll)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+
+def apply_job(descriptor: dict[str, Any]) -> None:
+    """Points the job details loader and `config` at the job's DIDs and directories,
+    creating the outputs and logs directories if needed."""
+
+    for key, value in descriptor.get("env", {}).items():
+        os.environ[key] = str(value)
+    for key, name in _ENV_FIELDS.items():
+        if key in descriptor:
+            value = descriptor[key]
+            os.environ[name] = value if isinstance(value, str) else json.dumps(value)
+
+    if "data" in descriptor:
+        for name, relative in _DATA_LAYOUT.items():
+            object.__setattr__(config, name, str(Path(descriptor["data"]) / relative))
+    names = {field.name for field in fields(config)}
+    for key, value in descriptor.get("paths", {}).items():
+        name = key if key.startswith("path_") else f"path_{key}"
+        if name not in names:
+            raise ValueError(f"Unknown path '{key}', expected one of {sorted(names)}")
+        object.__setattr__(config, name, str(value))
+
+    for path in (config.path_outputs, config.path_logs):
+        Path(path).mkdir(parents=True, exist_ok=True)
+
+
+class Daemon:
+    """Runs jobs from a spool in forked children of an already warmed-up process.
+
+    Imports, registries and model handshakes done before `serve` are inherited by every
+    child, which then only does the job's own work. Each job runs in its own process, so
+    a crash, leak or changed global cannot affect the next one; at most `max_jobs` run at
+    once and a job running longer than `job_timeout` seconds is killed.
+
+    Reports hold the job's exit code, the seconds it waited in the spool and ran
+    (`latency_seconds`), and `cold_start_seconds`, the preparation the daemon did once.
+    Their sum, `estimated_cold_seconds`, estimates the job's latency in a fresh process;
+    the daemon never runs a job cold, so it is not measured.
+    """
+
+    def __init__(
+        self,
+        spool: Spool,
+        job: Callable[[], Any],
+        cold_start_seconds: float = 0.0,
+        max_jobs: int = 1,
+        job_timeout: Optional[float] = None,
+        poll: float = 0.1,
+    ) -> None:
+        self.spool = spool
+        self.job = job
+        self.cold_start_seconds = cold_start_seconds
+        self.max_jobs = max(1, max_jobs)
+        self.job_timeout = job_timeout
+        self.poll = poll
+
+        self._children: dict[int, tuple[str, float, float]] = {}
+        self._stopping = False
+
+    def stop(self, *_: Any) -> None:
+        """Stops claiming jobs; the running ones are finished first."""
+
+        logger.info("Daemon stopping after the running jobs")
+        self._stopping = True
+
+    def serve(self, max_jobs_total: Optional[int] = None) -> int:
+        """Runs jobs until stopped (SIGTERM/SIGINT) or `max_jobs_total` have finished;
+        returns the number of jobs run."""
+
+        handlers = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        logger.info(f"Daemon ready after {self.cold_start_seconds:.3f}s, watching {self.spool.incoming}")
+
+        started = finished = 0
+        try:
+            while self._children or not self._stopping:
+                finished += self._reap()
+                if max_jobs_total is not None and started >= max_jobs_total:
+                    self._stopping = True
+                while not self._stopping and len(self._children) < self.max_jobs:
+                    claimed = self.spool.claim()
+                    if claimed is None:
+                        break
+                    self._fork(*claimed)
+                    started += 1
+                    if max_jobs_total is not None and started >= max_jobs_total:
+                        break
+                time.sleep(self.poll)
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+        return finished
+
+    def _fork(self, job_id: str, descriptor: dict[str, Any], submitted: float) -> None:
+        start = time.perf_counter()
+        log = self.spool.running / f"{job_id}.log"
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            self._child(descriptor, log)
+        logger.info(f"Job {job_id} started in process {pid}")
+        self._children[pid] = (job_id, start, max(0.0, time.time() - submitted))
+
+    def _child(self, descriptor: dict[str, Any], log: Path) -> None:
+        code = 1
+        try:
+            # The job's output goes to its own log, including that of the logging handlers
+            fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.dup2(fd, 1)
+            os.dup2(fd, 2)
+            os.close(fd)
+            sys.stdout = open(1, "w", buffering=1, encoding="utf-8", closefd=False)
+            sys.stderr = open(2, "w", buffering=1, encoding="utf-8", closefd=False)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+            apply_job(descriptor)
+            self.job()
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except BaseException:
+            logger.exception("Job failed")
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Skips the parent's exit handlers and buffered state
+            os._exit(code)
+
+    def _reap(self) -> int:
+        finished = 0
+        for pid, (job_id, start, queued) in list(self._children.items()):
+            waited, status = os.waitpid(pid, os.WNOHANG)
+            latency = time.perf_counter() - start
+            if not waited:
+                if self.job_timeout is not None and latency > self.job_timeout:
+                    logger.error(f"Job {job_id} exceeded {self.job_timeout}s, killing it")
+                    os.kill(pid, signal.SIGKILL)
+                continue
+
+            del self._children[pid]
+            finished += 1
+            report = {
+                "id": job_id,
+                "pid": pid,
+                "exit_code": os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+                "signal": os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+                "queue_seconds": round(queued, 3),
+                "latency_seconds": round(latency, 3),
+                "cold_start_seconds": round(self.cold_start_seconds, 3),
+                "estimated_cold_seconds": round(latency + self.cold_start_seconds, 3),
+            }
+            logger.info(f"Job {job_id} finished: {report}")
+            self.spool.finish(job_id, report)
+        return finished
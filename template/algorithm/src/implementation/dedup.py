@@ -0,0 +1,194 @@
+from dataclasses import asdict, dataclass
+from hashlib import blake2b
+from logging import getLogger
+from typing import Any, Optional
+
+import numpy as np
+
+logger = getLogger(__name__)
+
+# Mersenne prime used as the base of the polynomial shingle hash
+_SHINGLE_BASE = np.uint64(2**61 - 1)
+
+
+@dataclass
+class DedupStats:
+    chunks: int = 0
+    """Number of chunks seen"""
+
+    unique: int = 0
+    """Number of chunks that needed an embedding"""
+
+    near_duplicates: int = 0
+    """Number of chunks matched to a near-duplicate cluster"""
+
+    @property
+    def saved(self) -> int:
+        """Number of embedding calls avoided"""
+        return self.chunks - self.unique
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "saved": self.saved}
+
+
+class MinHashLSH:
+    """Finds near-duplicate texts with MinHash signatures and LSH banding.
+
+    Texts are shingled into overlapping byte k-grams; the shingles and the permutations
+    are hashed with vectorized NumPy operations, so a signature costs O(len(text)). The
+    signature is split into bands and texts sharing any band bucket with a cluster
+    representative are compared by their estimated Jaccard similarity. Only
+    representatives are indexed, so every lookup is O(bands).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ) -> None:
+        if not 0 < threshold <= 1:
+            raise ValueError(f"Invalid Jaccard threshold: {threshold}")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _optimal_bands(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift universal hashing: odd multipliers, keep the high 32 bits
+        self._a = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._powers = _SHINGLE_BASE ** np.arange(shingle_size, dtype=np.uint64)[::-1]
+
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(self.bands)]
+        self._signatures: dict[int, np.ndarray] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+        if len(data) < self.shingle_size:
+            data = np.pad(data, (0, self.shingle_size - len(data)))
+
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.shingle_size)
+        with np.errstate(over="ignore"):
+            shingles = windows @ self._powers
+            # Mix the bits so nearby shingles do not collide in the high bits
+            shingles ^= shingles >> np.uint64(31)
+            shingles *= np.uint64(0x9E3779B97F4A7C15)
+            hashes = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> np.uint64(32)
+
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def query(self, signature: np.ndarray) -> Optional[int]:
+        """Returns the id of a cluster whose representative is similar enough, if any."""
+
+        seen: set[int] = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            for candidate in bucket.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = np.mean(self._signatures[candidate] == signature)
+                if similarity >= self.threshold:
+                    return candidate
+        return None
+
+    def insert(self, signature: np.ndarray, cluster: int) -> None:
+        """Registers `signature` as the representative of `cluster`."""
+
+        self._signatures[cluster] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(cluster)
+
+
+def _optimal_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    """Picks the banding whose S-curve midpoint `(1 / bands) ** (1 / rows)` is closest
+    to `threshold`, breaking ties towards more bands (fewer false negatives).
+    """
+
+    bands = min(
+        range(1, num_perm + 1),
+        key=lambda b: (abs((1 / b) ** (1 / (num_perm // b)) - threshold), -b),
+    )
+    return bands, num_perm // bands
+
+
+class Deduplicator:
+    """Assigns each chunk the embedding row holding its vector.
+
+    Identical chunks share the row of their first occurrence, so they are embedded only
+    once; only a 16 byte digest is kept per distinct chunk. With a `MinHashLSH` index,
+    near-duplicates are clustered too: in `skip` mode they reuse the representative's row,
+    in `tag` mode they are embedded and only tagged with the representative's cluster.
+    """
+
+    MODES = ("skip", "tag")
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        near: Optional[MinHashLSH] = None,
+        near_mode: str = "skip",
+    ) -> None:
+        if near_mode not in self.MODES:
+            raise ValueError(f"Invalid near-duplicate mode: '{near_mode}' – use one of {self.MODES}")
+
+        self.enabled = enabled
+        self.near = near
+        self.near_mode = near_mode
+        self.stats = DedupStats()
+        self._rows: dict[bytes, tuple[int, int]] = {}
+
+    def add(self, text: str) -> tuple[int, int, bool]:
+        """Returns the embedding row and cluster of `text`, and whether the row is new.
+
+        The cluster is the row of the cluster representative, which is the row itself
+        when near-duplicate detection is disabled.
+        """
+
+        self.stats.chunks += 1
+        digest = None
+        if self.enabled:
+            digest = blake2b(text.encode("utf-8"), digest_size=16).digest()
+            if digest in self._rows:
+                row, cluster = self._rows[digest]
+                return row, cluster, False
+
+        cluster, signature = None, None
+        if self.near is not None:
+            signature = self.near.signature(text)
+            cluster = self.near.query(signature)
+
+        if cluster is not None:
+            self.stats.near_duplicates += 1
+            if self.near_mode == "skip":
+                if digest is not None:
+                    self._rows[digest] = (cluster, cluster)
+                return cluster, cluster, False
+
+        row = self.stats.unique
+        self.stats.unique += 1
+        if cluster is None:
+            cluster = row
+            if signature is not None:
+                self.near.insert(signature, row)
+
+        if digest is not None:
+            self._rows[digest] = (row, cluster)
+        return row, cluster, True
+
+    def report(self) -> dict[str, Any]:
+        stats = self.stats.to_dict()
+        logger.info(
+            f"Deduplication: {stats['chunks']} chunks, {stats['unique']} unique, "
+            f"{stats['near_duplicates']} near-duplicates, "
+            f"{stats['saved']} embedding calls saved"
+        )
+        return stats
@@ -0,0 +1,261 @@
+import re
+import time
+from logging import getLogger
+from typing import Any, Callable, Optional, Sequence
+
+import httpx
+import numpy as np
+from ollama import Client, ResponseError
+
+from implementation.metrics import SIZE_BUCKETS, Metrics
+
+logger = getLogger(__name__)
+
+# Runs of up to four word characters (about one sub-word token each) and single
+# punctuation characters; JSON keys and quotes cost tokens too
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Vectors and the number of tokens the server evaluated for a list of texts
+EmbedCall = Callable[[list[str]], tuple[Sequence[Sequence[float]], Optional[int]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, deliberately pessimistic estimate of the tokens a text is split into.
+
+    Words are counted as one token per few characters and every punctuation character
+    as a token of its own, which is close to what WordPiece/BPE tokenizers do with
+    serialized records.
+    """
+
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+class OllamaEmbedder:
+    """Calls Ollama's `/api/embed` directly.
+
+    Inputs longer than the context are rejected instead of silently truncated, and the
+    number of evaluated tokens is returned to calibrate the batching.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        context_length: int,
+        keep_alive: str = "30m",
+        timeout: Optional[float] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.model = model
+        self.context_length = context_length
+        self.keep_alive = keep_alive
+        self.metrics = metrics or Metrics(enabled=False)
+        self._client = Client(host=base_url, timeout=timeout)
+
+    def __call__(self, texts: list[str]) -> tuple[Sequence[Sequence[float]], Optional[int]]:
+        response = self._client.embed(
+            model=self.model,
+            input=texts,
+            truncate=False,
+            options={"num_ctx": self.context_length},
+            keep_alive=self.keep_alive,
+        )
+        # Time spent in the server; the rest of the request latency is queueing, network
+        # and (de)serialization
+        if response.total_duration:
+            self.metrics.observe("embed.server_seconds", response.total_duration / 1e9)
+        if response.load_duration:
+            self.metrics.count("embed.model_load_seconds", response.load_duration / 1e9)
+        return response.embeddings, response.prompt_eval_count
+
+
+class _Retries:
+    """Retries left to one batch, shared by the requests it is split into."""
+
+    def __init__(self, remaining: int) -> None:
+        self.remaining = remaining
+
+
+class AdaptiveBatcher:
+    """Packs texts into embedding requests up to a token budget tuned online.
+
+    After every request the time per token is compared with the best seen recently: while
+    it stays within `tolerance` the budget grows by `context_length / 2` tokens (additive
+    increase), once the server slows down or fails it is cut by `decrease` (multiplicative
+    decrease). Estimated token counts are scaled by the ratio of tokens the server
+    reported to the estimate.
+
+    Texts that do not fit the context are split and their vectors averaged, so every text
+    still gets exactly one vector.
+    """
+
+    def __init__(
+        self,
+        embed: EmbedCall,
+        context_length: int,
+        budget: Optional[int] = None,
+        max_budget: Optional[int] = None,
+        max_texts: int = 256,
+        tolerance: float = 0.5,
+        decrease: float = 0.5,
+        retries: int = 3,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.embed = embed
+        self.metrics = metrics or Metrics(enabled=False)
+        self.context_length = context_length
+        self.min_budget = context_length
+        self.max_budget = max_budget or 32 * context_length
+        self.budget = min(budget or 4 * context_length, self.max_budget)
+        self.max_texts = max_texts
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self.retries = retries
+
+        self.ratio = 1.0
+        self._best: Optional[float] = None
+        self.stats: dict[str, Any] = dict(requests=0, tokens=0, seconds=0.0, retries=0, splits=0)
+
+    def token_budget(self) -> int:
+        """Budget in estimated tokens, for callers that pack their own batches."""
+
+        return int(self.budget / self.ratio)
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(texts, _Retries(self.retries))
+
+    def _embed(self, texts: list[str], retries: "_Retries") -> list[list[float]]:
+        vectors: list[list[float]] = []
+        request: list[str] = []
+        estimated = 0
+        for text in texts:
+            size = estimate_tokens(text)
+            if size * self.ratio > self.context_length:
+                vectors.extend(self._send(request, retries, estimated))
+                request, estimated = [], 0
+                vectors.append(self._split(text, retries))
+                continue
+
+            request.append(text)
+            estimated += size
+            # Same rule as the pipeline's batches, so a full batch is sent in one request
+            if estimated * self.ratio >= self.budget or len(request) >= self.max_texts:
+                vectors.extend(self._send(request, retries, estimated))
+                request, estimated = [], 0
+
+        vectors.extend(self._send(request, retries, estimated))
+        return vectors
+
+    def report(self) -> dict[str, Any]:
+        report = {
+            **self.stats,
+            "seconds": round(self.stats["seconds"], 3),
+            "tokens_per_second": round(self.stats["tokens"] / self.stats["seconds"], 1)
+            if self.stats["seconds"]
+            else None,
+            "budget": int(self.budget),
+            "token_ratio": round(self.ratio, 3),
+        }
+        logger.info(f"Embedding requests: {report}")
+        return report
+
+    def _send(
+        self,
+        texts: list[str],
+        retries: "_Retries",
+        estimated: Optional[int] = None,
+    ) -> list[list[float]]:
+        """Embeds `texts` in one request, retrying transient failures with backoff.
+
+        Retries are drawn from `retries`, shared by every request of the batch, so a
+        dead server fails the batch after a few attempts. Only a context-length
+        rejection splits the request.
+        """
+
+        if not texts:
+            return []
+        if estimated is None:
+            estimated = sum(estimate_tokens(text) for text in texts)
+
+        while True:
+            start = time.perf_counter()
+            try:
+                vectors, tokens = self.embed(texts)
+            except ResponseError as e:
+                self.metrics.count("embed.failures", status=e.status_code)
+                if e.status_code == 400 and "context" in str(e).lower():
+                    # The estimate was too low for some text; find and split it
+                    self.ratio *= 1.25
+                    return self._bisect(texts, retries)
+                if e.status_code < 500 and e.status_code != 429:
+                    raise
+                error: Exception = e
+            except (ConnectionError, httpx.TransportError) as e:
+                self.metrics.count("embed.failures", status=type(e).__name__)
+                error = e
+            else:
+                seconds = time.perf_counter() - start
+                self._observe(estimated, tokens, seconds)
+                self.metrics.observe("embed.request_seconds", seconds)
+                self.metrics.observe("embed.request_texts", len(texts), SIZE_BUCKETS)
+                self.metrics.observe("embed.request_tokens", tokens or estimated, SIZE_BUCKETS)
+                self.metrics.gauge("embed.token_budget", self.budget)
+                return [list(vector) for vector in vectors]
+
+            self.budget = max(self.min_budget, self.budget * self.decrease)
+            if not retries.remaining:
+                raise error
+            attempt = self.retries - retries.remaining
+            retries.remaining -= 1
+            self.stats["retries"] += 1
+            self.metrics.count("embed.retries")
+            logger.warning(f"Embedding request failed ({error}), retrying with budget {self.budget:.0f}")
+            time.sleep(0.5 * 2**attempt)
+
+    def _bisect(self, texts: list[str], retries: "_Retries") -> list[list[float]]:
+        if len(texts) == 1:
+            return [self._split(texts[0], retries)]
+        middle = len(texts) // 2
+        return self._send(texts[:middle], retries) + self._send(texts[middle:], retries)
+
+    def _split(self, text: str, retries: "_Retries") -> list[float]:
+        """Embeds an over-long text in halves and returns their token-weighted mean."""
+
+        self.stats["splits"] += 1
+        self.metrics.count("embed.splits")
+        middle = len(text) // 2
+        # Cut at whitespace close to the middle to keep words intact
+        cut = text.rfind(" ", 0, middle)
+        cut = cut if cut > middle // 2 else middle
+        halves = [text[:cut], text[cut:]]
+        if not halves[0] or not halves[1]:
+            raise ValueError("Cannot split text further to fit the context")
+
+        weights = np.array([estimate_tokens(half) for half in halves], dtype=np.float64)
+        vectors = np.array(self._embed(halves, retries), dtype=np.float64)
+        mean = weights @ vectors / weights.sum()
+        norm = np.linalg.norm(mean)
+        return (mean / norm if norm else mean).tolist()
+
+    def _observe(self, estimated: int, tokens: Optional[int], seconds: float) -> None:
+        if tokens:
+            # Smoothed so a single unusual request does not swing the packing
+            self.ratio = 0.8 * self.ratio + 0.2 * tokens / max(estimated, 1)
+        else:
+            tokens = estimated
+
+        self.stats["requests"] += 1
+        self.stats["tokens"] += tokens
+        self.stats["seconds"] += seconds
+
+        # Requests well under the budget (e.g. the tail of a batch) say little about it
+        if tokens < self.budget / 2:
+            return
+
+        per_token = seconds / max(tokens, 1)
+        # The reference drifts up slowly so one unusually fast request does not stick
+        self._best = per_token if self._best is None else min(per_token, self._best * 1.05)
+        if per_token <= self._best * (1 + self.tolerance):
+            self.budget = min(self.max_budget, self.budget + self.context_length / 2)
+        else:
+            self.budget = max(self.min_budget, self.budget * self.decrease)
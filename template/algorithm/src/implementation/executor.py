@@ -0,0 +1,154 @@
+# Copied verbatim into both algorithm trees (template/ and sample_timeseries_forecast/):
+# each is built into its own image from its own directory, so neither can import the
+# other's. Keep the two copies identical; tests/test_shared.py checks it.
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+logger = getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FileTask:
+    did: str
+    path: Path
+    size: int
+
+
+@dataclass
+class FileReport(Generic[T]):
+    did: str
+    file: str
+    status: str = "pending"
+    """`ok` or `failed`"""
+
+    seconds: float = 0.0
+    error: Optional[str] = None
+    details: dict[str, Any] = field(default_factory=dict)
+    value: Optional[T] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        report = asdict(self)
+        report.pop("value")
+        return report
+
+
+def _natural_key(path: Path) -> list[Any]:
+    # Runs of digits compare as numbers, so shard `2` comes before shard `10`
+    return [int(part) if part.isdigit() else part for part in re.split(r"([0-9]+)", str(path))]
+
+
+def job_files(files: Any) -> list[FileTask]:
+    """Lists every input file of every DID, in DID order and by file name within one
+    (numbers in names in numeric order).
+
+    A file that cannot be found is still listed, with size 0, so that it gets a
+    `failed` report like any other file that cannot be read.
+    """
+
+    tasks = []
+    for did_paths in files.files:
+        for path in sorted(map(Path, did_paths.input_files), key=_natural_key):
+            if not path.exists():
+                path = Path.cwd() / path
+            try:
+                size = path.stat().st_size
+            except OSError:
+                size = 0
+            tasks.append(FileTask(getattr(did_paths, "did", ""), path, size))
+    return tasks
+
+
+def available_memory() -> Optional[int]:
+    """Bytes of memory available to new allocations, if the platform reports it."""
+
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class FileExecutor:
+    """Runs a function over input files on a bounded thread pool.
+
+    A file is only started while the estimated memory of the running ones, `cost(task)`
+    each, fits `memory_budget` (half the available memory by default); one file always
+    runs even if it alone exceeds the budget. A failing file is reported and does not
+    stop the others.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        cost: Callable[[FileTask], int] = lambda task: task.size,
+        memory_budget: Optional[int] = None,
+    ) -> None:
+        self.workers = max(1, workers or min(4, os.cpu_count() or 1))
+        self.cost = cost
+        if memory_budget is None:
+            available = available_memory()
+            memory_budget = available // 2 if available else None
+        self.memory_budget = memory_budget
+
+        self._admitted = threading.Condition()
+        self._running = 0
+        self._reserved = 0
+
+    def map(self, fn: Callable[[FileTask], T], tasks: list[FileTask]) -> list[FileReport[T]]:
+        """Runs `fn` on every task and returns their reports in task order."""
+
+        reports = [FileReport[T](task.did, task.path.name) for task in tasks]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file") as pool:
+            for task, report in zip(tasks, reports):
+                cost = self.cost(task)
+                self._admit(cost)
+                pool.submit(self._run, fn, task, report, cost)
+
+        failed = sum(report.status == "failed" for report in reports)
+        logger.info(f"Processed {len(reports) - failed}/{len(reports)} files")
+        return reports
+
+    def _admit(self, cost: int) -> None:
+        with self._admitted:
+            while self._running and (
+                self._running >= self.workers
+                or (
+                    self.memory_budget is not None
+                    and self._reserved + cost > self.memory_budget
+                )
+            ):
+                self._admitted.wait()
+            self._running += 1
+            self._reserved += cost
+
+    def _run(self, fn: Callable[[FileTask], T], task: FileTask, report: FileReport, cost: int) -> None:
+        start = time.perf_counter()
+        logger.info(f"Processing {task.did}/{task.path.name} ({task.size} bytes)")
+        try:
+            report.value = fn(task)
+            report.status = "ok"
+        except Exception as e:
+            logger.exception(f"Failed to process {task.did}/{task.path.name}: {e}")
+            report.status = "failed"
+            report.error = f"{type(e).__name__}: {e}"
+        finally:
+            report.seconds = round(time.perf_counter() - start, 3)
+            logger.info(f"{task.did}/{task.path.name}: {report.status} in {report.seconds}s")
+            with self._admitted:
+                self._running -= 1
+                self._reserved -= cost
+                self._admitted.notify_all()
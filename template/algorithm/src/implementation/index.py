@@ -0,0 +1,432 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+logger = getLogger(__name__)
+
+# Database rows scored per matrix multiplication, bounds the (queries x block) score matrix
+BLOCK_SIZE = 65536
+
+
+def normalize(vectors: Any) -> np.ndarray:
+    """Returns L2-normalized float32 rows, so inner products are cosine similarities."""
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def inverse_norms(vectors: Any) -> np.ndarray:
+    """Returns `1 / |row|` for every row, computed in blocks of `BLOCK_SIZE` rows."""
+
+    result = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), BLOCK_SIZE):
+        block = np.asarray(vectors[start : start + BLOCK_SIZE], dtype=np.float32)
+        norms = np.linalg.norm(block, axis=1)
+        result[start : start + len(block)] = 1 / np.maximum(norms, np.finfo(np.float32).tiny)
+    return result
+
+
+def _merge_top_k(
+    scores: np.ndarray,
+    ids: np.ndarray,
+    k: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Keeps the `k` best columns of each row of `scores`, sorted by decreasing score."""
+
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        ids = np.take_along_axis(ids, part, axis=1)
+
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(ids, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+class ExactIndex:
+    """Brute-force cosine similarity search.
+
+    The vectors are used as they are, with the inverse norm of every row kept alongside,
+    so they can be the memory-mapped embeddings file itself. Queries are scored in
+    batches against blocks of `BLOCK_SIZE` rows, so the database can be larger than RAM.
+    """
+
+    kind = "exact"
+
+    def __init__(self, vectors: np.ndarray, inverse_norms: Optional[np.ndarray] = None) -> None:
+        self.vectors = vectors
+        self.inverse_norms = inverse_norms
+
+    @classmethod
+    def build(cls, vectors: Any, **_: Any) -> "ExactIndex":
+        return cls(vectors, inverse_norms(vectors))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, queries: Any, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the ids and scores of the `k` nearest rows for each query."""
+
+        queries = normalize(queries)
+        k = min(k, len(self))
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, len(self), BLOCK_SIZE):
+            block = np.asarray(self.vectors[start : start + BLOCK_SIZE], dtype=np.float32)
+            scores = (queries @ block.T) * self.inverse_norms[start : start + len(block)]
+            ids = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+            best_ids, best_scores = _merge_top_k(
+                np.hstack([best_scores, scores]),
+                np.hstack([best_ids, ids]),
+                k,
+            )
+
+        return best_ids, best_scores
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {"inverse_norms": self.inverse_norms}
+
+    def _meta(self) -> dict[str, Any]:
+        return {}
+
+    def save(self, path: Path) -> None:
+        """Writes the index to the `path` directory.
+
+        Vectors memory-mapped from an `.npy` file (the job's `embeddings.npy`) are not
+        copied, `index.json` points at that file; others are saved as `vectors.npy`.
+        """
+
+        path.mkdir(parents=True, exist_ok=True)
+        for name, array in self._arrays().items():
+            np.save(path / f"{name}.npy", array)
+
+        source = getattr(self.vectors, "filename", None)
+        if isinstance(self.vectors, np.memmap) and source and str(source).endswith(".npy"):
+            vectors = os.path.relpath(source, path)
+        else:
+            vectors = "vectors.npy"
+            np.save(path / vectors, self.vectors)
+
+        with open(path / "index.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"kind": self.kind, "rows": len(self), "vectors": vectors, **self._meta()},
+                f,
+                indent=2,
+            )
+        logger.info(f"Saved {self.kind} index with {len(self)} rows to {path}")
+
+
+class IVFIndex(ExactIndex):
+    """Inverted file index: rows are bucketed by their nearest k-means centroid and a
+    query only scores the rows in its `nprobe` closest buckets.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        inverse_norms: np.ndarray,
+        centroids: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        nprobe: int = 8,
+    ) -> None:
+        super().__init__(vectors, inverse_norms)
+        self.centroids = centroids
+        self.order = order
+        """Row ids sorted by list"""
+        self.offsets = offsets
+        """List `i` holds `order[offsets[i]:offsets[i + 1]]`"""
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(
+        cls,
+        vectors: Any,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        iterations: int = 10,
+        seed: int = 0,
+        **_: Any,
+    ) -> "IVFIndex":
+        nlist = min(nlist or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        centroids = _kmeans(vectors, nlist, iterations, seed)
+
+        # The nearest centroid does not depend on the row's norm
+        assignment = _assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        logger.info(f"Built IVF index with {nlist} lists over {len(vectors)} rows")
+        return cls(vectors, inverse_norms(vectors), centroids, order, offsets, nprobe)
+
+    def search(self, queries: Any, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        queries = normalize(queries)
+        k = min(k, len(self))
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate(
+                [self.order[self.offsets[j] : self.offsets[j + 1]] for j in lists]
+            )
+            if not len(candidates):
+                continue
+            rows = np.asarray(self.vectors[candidates], dtype=np.float32)
+            candidate_scores = (rows @ query) * self.inverse_norms[candidates]
+            top_ids, top_scores = _merge_top_k(
+                candidate_scores[None, :], candidates[None, :], k
+            )
+            ids[i, : top_ids.shape[1]] = top_ids[0]
+            scores[i, : top_scores.shape[1]] = top_scores[0]
+
+        return ids, scores
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {
+            **super()._arrays(),
+            "centroids": self.centroids,
+            "order": self.order,
+            "offsets": self.offsets,
+        }
+
+    def _meta(self) -> dict[str, Any]:
+        return {"nlist": len(self.centroids), "nprobe": self.nprobe}
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Returns the nearest centroid of every row, computed in blocks."""
+
+    return np.concatenate(
+        [
+            np.argmax(
+                np.asarray(vectors[start : start + BLOCK_SIZE], dtype=np.float32) @ centroids.T,
+                axis=1,
+            )
+            for start in range(0, len(vectors), BLOCK_SIZE)
+        ]
+    )
+
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int, seed: int) -> np.ndarray:
+    """Spherical k-means on a sample of the rows."""
+
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), 256 * k)
+    sample = normalize(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _assign(sample, centroids)
+        order = np.argsort(assignment, kind="stable")
+        clusters, starts = np.unique(assignment[order], return_index=True)
+        # Empty clusters keep their previous centroid
+        centroids[clusters] = np.add.reduceat(sample[order], starts, axis=0)
+        centroids = normalize(centroids)
+
+    return centroids
+
+
+# Bits set in every byte value, for Hamming distances on numpy versions without bitwise_count
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def _popcount(codes: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(codes)
+    return _POPCOUNT[codes]
+
+
+class _RescoringIndex(ExactIndex, ABC):
+    """Scans compact codes to shortlist `k * rescore` candidates per query, then rescores
+    them exactly against the full-precision vectors.
+
+    Only the codes are held in memory; the float vectors are usually memory-mapped so
+    rescoring pages in just the shortlisted rows.
+    """
+
+    def __init__(self, vectors: np.ndarray, codes: np.ndarray, rescore: int = 4) -> None:
+        # Rescored rows are normalized as they are read, no norms are kept
+        super().__init__(vectors)
+        self.codes = codes
+        self.rescore = rescore
+
+    @abstractmethod
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Codes of normalized `vectors`."""
+
+    @abstractmethod
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate (queries x rows) scores of normalized `queries` against `codes`."""
+
+    def _block_size(self, n_queries: int) -> int:
+        return BLOCK_SIZE
+
+    def search(self, queries: Any, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        queries = normalize(queries)
+        k = min(k, len(self))
+        shortlist = min(k * max(self.rescore, 1), len(self))
+
+        # First pass over the codes
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        block_size = self._block_size(len(queries))
+        for start in range(0, len(self), block_size):
+            scores = self._approximate_scores(queries, self.codes[start : start + block_size])
+            ids = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            best_ids, best_scores = _merge_top_k(
+                np.hstack([best_scores, scores]),
+                np.hstack([best_ids, ids]),
+                shortlist,
+            )
+
+        if self.rescore <= 0:
+            return best_ids[:, :k], best_scores[:, :k]
+
+        # Exact rescoring of the shortlisted rows, read in increasing order for locality
+        candidates = np.unique(best_ids)
+        exact = normalize(self.vectors[candidates])
+        position = np.searchsorted(candidates, best_ids)
+        scores = np.einsum("qd,qcd->qc", queries, exact[position])
+        return _merge_top_k(scores, best_ids, k)
+
+    @classmethod
+    def build(cls, vectors: Any, rescore: int = 4, **_: Any) -> "_RescoringIndex":
+        index = cls(vectors, np.empty(0), rescore)
+        index.fit(vectors)
+        index.codes = np.concatenate(
+            [
+                index._encode(normalize(vectors[start : start + BLOCK_SIZE]))
+                for start in range(0, len(vectors), BLOCK_SIZE)
+            ]
+        )
+        float_bytes = 4 * np.prod(np.shape(vectors))
+        logger.info(
+            f"Built {cls.kind} index over {len(vectors)} rows: {index.codes.nbytes} bytes of "
+            f"codes, {float_bytes / max(index.codes.nbytes, 1):.0f}x smaller than float32"
+        )
+        return index
+
+    def fit(self, vectors: Any) -> None:
+        pass
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {"codes": self.codes}
+
+    def _meta(self) -> dict[str, Any]:
+        return {"rescore": self.rescore}
+
+
+class Int8Index(_RescoringIndex):
+    """Scalar quantization: every dimension is mapped to int8 with its own scale and
+    offset, so approximate scores are a single int8 x float32 product per block.
+    """
+
+    kind = "int8"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        codes: np.ndarray,
+        rescore: int = 4,
+        scale: Optional[np.ndarray] = None,
+        offset: Optional[np.ndarray] = None,
+    ) -> None:
+        super().__init__(vectors, codes, rescore)
+        self.scale = scale
+        self.offset = offset
+
+    def fit(self, vectors: Any) -> None:
+        low, high = None, None
+        for start in range(0, len(vectors), BLOCK_SIZE):
+            block = normalize(vectors[start : start + BLOCK_SIZE])
+            low = block.min(axis=0) if low is None else np.minimum(low, block.min(axis=0))
+            high = block.max(axis=0) if high is None else np.maximum(high, block.max(axis=0))
+
+        self.scale = np.maximum(high - low, 1e-12).astype(np.float32) / 255
+        self.offset = low.astype(np.float32)
+
+    def _block_size(self, n_queries: int) -> int:
+        # Bounds the float32 copy of each block of codes to ~64MB
+        return max(1, 2**24 // max(self.codes.shape[1], 1))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.offset) / self.scale) - 128
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # q . x  ~=  q . ((code + 128) * scale + offset)
+        weights = queries * self.scale
+        bias = queries @ self.offset + 128 * weights.sum(axis=1)
+        return weights @ codes.T.astype(np.float32) + bias[:, None]
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {**super()._arrays(), "scale": self.scale, "offset": self.offset}
+
+
+class BinaryIndex(_RescoringIndex):
+    """Sign quantization: one bit per dimension (32x smaller than float32), shortlisted
+    by Hamming distance.
+    """
+
+    kind = "binary"
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(vectors > 0, axis=1)
+
+    def _block_size(self, n_queries: int) -> int:
+        # Bounds the (queries x rows x bytes) XOR temporary to ~64MB
+        return max(1, 2**26 // max(n_queries * self.codes.shape[1], 1))
+
+    def _approximate_scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        packed = self._encode(queries)
+        distances = _popcount(packed[:, None, :] ^ codes[None, :, :]).sum(axis=2, dtype=np.int32)
+        return -distances.astype(np.float32)
+
+
+INDEXES = {index.kind: index for index in (ExactIndex, IVFIndex, Int8Index, BinaryIndex)}
+
+
+def build_index(kind: str, vectors: Any, **options: Any) -> ExactIndex:
+    if kind not in INDEXES:
+        raise ValueError(f"Unsupported index: '{kind}' – use one of {tuple(INDEXES)}")
+    return INDEXES[kind].build(vectors, **options)
+
+
+def load_index(path: Path, mmap: bool = True) -> ExactIndex:
+    """Loads an index saved with `save`; the vectors are memory-mapped by default."""
+
+    with open(path / "index.json", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    vectors = np.load(path / meta["vectors"], mmap_mode="r" if mmap else None)
+    if meta["kind"] == Int8Index.kind:
+        return Int8Index(
+            vectors,
+            np.load(path / "codes.npy"),
+            meta.get("rescore", 4),
+            np.load(path / "scale.npy"),
+            np.load(path / "offset.npy"),
+        )
+    if meta["kind"] == BinaryIndex.kind:
+        return BinaryIndex(vectors, np.load(path / "codes.npy"), meta.get("rescore", 4))
+    if meta["kind"] == IVFIndex.kind:
+        return IVFIndex(
+            vectors,
+            np.load(path / "inverse_norms.npy"),
+            np.load(path / "centroids.npy"),
+            np.load(path / "order.npy"),
+            np.load(path / "offsets.npy"),
+            meta.get("nprobe", 8),
+        )
+    return ExactIndex(vectors, np.load(path / "inverse_norms.npy"))
@@ -0,0 +1,235 @@
+import csv
+import json
+import re
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Iterator, Optional, TextIO
+
+from implementation.source import COMPRESSED_SUFFIXES, open_input
+
+logger = getLogger(__name__)
+
+# How much of the file is inspected to guess its format
+SNIFF_SIZE = 8 * 1024
+
+# How much text is read at a time while incrementally parsing a JSON array
+READ_SIZE = 64 * 1024
+
+FORMATS = ("json", "jsonl", "csv")
+
+_EXTENSIONS = {
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+}
+
+_WHITESPACE = " \t\n\r"
+# Characters that can continue a JSON number
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+# Numbers as pandas reads them from CSV: ASCII digits only, no `_` separators
+_INT = re.compile(r"\s*[+-]?[0-9]+\s*", re.ASCII)
+_FLOAT = re.compile(
+    r"\s*[+-]?(?:(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|inf|infinity|nan)\s*", re.ASCII | re.IGNORECASE
+)
+
+
+def sniff_format(path: Path) -> str:
+    """Guesses the format of `path` from its first few KB.
+
+    Returns `json` for a JSON array or a single JSON object, `jsonl` for one JSON value
+    per line and `csv` otherwise.
+    """
+
+    with open_input(path, text=True, mode="direct") as f:
+        head = f.read(SNIFF_SIZE)
+
+    sample = head.lstrip(_WHITESPACE)
+    if not sample:
+        raise ValueError(f"Could not auto-detect file type of empty file {path}")
+
+    if sample[0] == "[":
+        return "json"
+
+    if sample[0] == "{":
+        first_line = sample.split("\n", 1)[0]
+        try:
+            json.loads(first_line)
+            return "jsonl"
+        except json.JSONDecodeError:
+            # A pretty-printed object, or a single line longer than the sniffed sample
+            return "json"
+
+    return "csv"
+
+
+def detect_format(path: Path) -> str:
+    """Resolves the format of `path` from its extension, sniffing the content if it has none.
+
+    A compression extension (`.gz`, `.zst`) is skipped, `records.jsonl.gz` is JSON lines.
+    """
+
+    ext = path.suffix.lower()
+    if ext in COMPRESSED_SUFFIXES:
+        ext = Path(path.stem).suffix.lower()
+    if not ext:
+        return sniff_format(path)
+    if ext not in _EXTENSIONS:
+        raise ValueError(
+            f"Unsupported file type: '{ext}' – only .csv, .json or .jsonl allowed"
+        )
+
+    format = _EXTENSIONS[ext]
+    # Files named .json are often JSON lines
+    if format == "json" and sniff_format(path) == "jsonl":
+        return "jsonl"
+    return format
+
+
+def iter_records(path: Path, format: Optional[str] = None) -> Iterator[Any]:
+    """Lazily yields the records in `path` without loading the whole file.
+
+    A JSON array yields its elements, a single JSON object yields itself, JSON lines
+    yield one value per line and CSV files yield one dict per row. The format is resolved
+    eagerly so unsupported inputs fail before any work is done.
+    """
+
+    format = format or detect_format(path)
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported format: '{format}' – use one of {FORMATS}")
+
+    logger.info(f"Reading {format} records from {path}")
+    return _read_records(path, format)
+
+
+def _read_records(path: Path, format: str) -> Iterator[Any]:
+    with open_input(path, text=True, newline="" if format == "csv" else None) as f:
+        if format == "json":
+            yield from _iter_json(f)
+        elif format == "jsonl":
+            yield from _iter_jsonl(f)
+        else:
+            for row in csv.DictReader(f):
+                yield {key: _coerce(value) for key, value in row.items()}
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[Any]:
+    for number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {e}") from e
+
+
+def _iter_json(f: TextIO) -> Iterator[Any]:
+    reader = _JsonArrayReader(f)
+    first = reader.peek()
+
+    if first == "[":
+        yield from reader
+    elif first == "{":
+        # A single object is a single record; it has to be parsed as a whole
+        yield json.loads(reader.rest())
+    else:
+        raise ValueError("Loaded data must be a list or dict")
+
+
+class _JsonArrayReader:
+    """Incrementally decodes the elements of a top-level JSON array.
+
+    Only the element being decoded (plus one read) is buffered, so memory stays bounded by
+    the largest record rather than the size of the file.
+    """
+
+    def __init__(self, f: TextIO) -> None:
+        self._file = f
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads more text into the buffer, returns False at the end of the file."""
+
+        if self._eof:
+            return False
+
+        # Read at least as much as is buffered, so re-decoding a large element stays linear
+        chunk = self._file.read(max(READ_SIZE, len(self._buffer) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it."""
+
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def rest(self) -> str:
+        while self._fill():
+            pass
+        return self._buffer[self._pos :]
+
+    def _expect(self, *chars: str) -> str:
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Invalid JSON array: expected one of {chars}, got {char!r}")
+        self._pos += 1
+        return char
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("[")
+        if self.peek() == "]":
+            return
+
+        while True:
+            yield self._decode()
+            if self._expect(",", "]") == "]":
+                return
+
+    def _decode(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number may be cut short by the buffer end, even before its `.` or `e`
+                complete = end < len(self._buffer) and not (
+                    isinstance(value, (int, float))
+                    and not isinstance(value, bool)
+                    and self._buffer[end] in _NUMBER_CHARS
+                )
+                if complete or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise ValueError(f"Invalid JSON array element: {e}") from e
+
+            if not self._fill() and self._eof and self._pos >= len(self._buffer):
+                raise ValueError("Unexpected end of JSON array")
+
+
+def _coerce(value: Optional[str]) -> Any:
+    """Restores the numbers and missing values that CSV flattens into strings."""
+
+    if value is None or value == "":
+        return None
+    if _INT.fullmatch(value):
+        return int(value)
+    if _FLOAT.fullmatch(value):
+        return float(value)
+    return value
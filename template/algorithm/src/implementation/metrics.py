@@ -0,0 +1,181 @@
+import bisect
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+logger = getLogger(__name__)
+
+# Upper bounds of the default histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Upper bounds for counts such as texts or tokens per request
+SIZE_BUCKETS = tuple(2**i for i in range(17))
+
+
+class Histogram:
+    """Counts observations in fixed buckets; quantiles are interpolated within them."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.bounds = list(buckets) + [math.inf]
+        self.counts = [0] * len(self.bounds)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[i - 1] if i else min(self.min, self.bounds[0])
+                high = min(self.bounds[i], self.max)
+                low = max(low, self.min)
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                ("+Inf" if bound == math.inf else str(bound)): count
+                for bound, count in zip(self.bounds, self.counts)
+            },
+        }
+
+
+def _key(name: str, labels: dict[str, Any]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """Thread-safe counters, gauges, histograms and phase timings of a job.
+
+    Names are dotted (`embed.request_seconds`) and may carry labels. A disabled instance
+    accepts every call and records nothing, so components can be instrumented
+    unconditionally.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.phases: dict[str, float] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(
+        self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: Any
+    ) -> None:
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Adds the time spent in the block to phase `name`."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "histograms": {key: h.to_dict() for key, h in self.histograms.items()},
+            }
+
+    def to_openmetrics(self) -> str:
+        """Renders the metrics in the OpenMetrics text format."""
+
+        def metric(key: str, suffix: str = "", **extra: Any) -> str:
+            name, _, labels = key.partition("{")
+            labels = labels.rstrip("}")
+            extra_labels = ",".join(f'{k}="{v}"' for k, v in extra.items())
+            labels = ",".join(filter(None, [labels, extra_labels]))
+            name = name.replace(".", "_") + suffix
+            return f"{name}{{{labels}}}" if labels else name
+
+        def family(key: str) -> str:
+            return key.partition("{")[0].replace(".", "_")
+
+        lines: list[str] = []
+        with self._lock:
+            for name, seconds in self.phases.items():
+                lines.append(f"{metric('phase.seconds', phase=name)} {seconds}")
+            for key, value in self.counters.items():
+                lines.append(f"{metric(key, '_total')} {value}")
+            for key, value in self.gauges.items():
+                lines.append(f"{metric(key)} {value}")
+            for key, h in self.histograms.items():
+                lines.append(f"# TYPE {family(key)} histogram")
+                cumulative = 0
+                for bound, count in zip(h.bounds, h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else str(bound)
+                    lines.append(f"{metric(key, '_bucket', le=le)} {cumulative}")
+                lines.append(f"{metric(key, '_count')} {h.count}")
+                lines.append(f"{metric(key, '_sum')} {h.sum}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory: Path, openmetrics: bool = False) -> None:
+        """Writes `metrics.json` (and `metrics.prom`) to `directory`."""
+
+        if not self.enabled:
+            return
+
+        with open(directory / "metrics.json", "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        if openmetrics:
+            with open(directory / "metrics.prom", "w", encoding="utf-8") as f:
+                f.write(self.to_openmetrics())
+        logger.info(f"Metrics written to {directory}")
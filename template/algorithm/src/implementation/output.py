@@ -0,0 +1,256 @@
+import json
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Sequence
+
+import numpy as np
+
+logger = getLogger(__name__)
+
+# Fixed size reserved for the .npy header so the final shape can be patched in place
+# once every row has been written. 128 bytes fits any (rows, columns) shape.
+_NPY_HEADER_SIZE = 128
+
+# Columns of the sources table, one row per chunk. `row` is the embedding row holding the
+# chunk's vector, which is shared by all the copies of a duplicated chunk. `cluster` is
+# the row of the near-duplicate cluster representative (the row itself if none).
+SOURCE_COLUMNS = ["record", "chunk", "offset", "row", "cluster"]
+
+
+class _Appender:
+    """Base class for files that grow by rows and can be resumed from a checkpoint."""
+
+    def __init__(self, path: Path, columns: Optional[int], resume: Optional[dict]) -> None:
+        self.path = path
+        self.columns = columns
+        self.rows = 0
+
+        if resume and path.exists():
+            # Drop anything written after the last checkpoint
+            self._file: BinaryIO = open(path, "r+b")
+            self._file.truncate(resume["offset"])
+            self._file.seek(resume["offset"])
+            self.rows = resume["rows"]
+            self.columns = resume["columns"]
+        else:
+            self._file = open(path, "wb")
+            self._start()
+
+    def _start(self) -> None:
+        pass
+
+    def checkpoint(self) -> dict[str, Any]:
+        """Flushes the file to disk and returns the state needed to resume from here."""
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {"rows": self.rows, "columns": self.columns, "offset": self._file.tell()}
+
+
+class NpyAppender(_Appender):
+    """Appends rows to a 2D `.npy` file without holding them in memory.
+
+    The header is written with a placeholder shape and rewritten on `close`, so the
+    resulting file can be opened with `np.load(path, mmap_mode="r")`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        dtype: str,
+        columns: Optional[int] = None,
+        resume: Optional[dict] = None,
+    ) -> None:
+        self.dtype = np.dtype(dtype)
+        super().__init__(path, columns, resume)
+
+    def _start(self) -> None:
+        self._file.write(b"\0" * _NPY_HEADER_SIZE)
+
+    def write(self, rows: Any) -> None:
+        block = np.ascontiguousarray(rows, dtype=self.dtype)
+        if block.ndim != 2:
+            raise ValueError(f"Expected a 2D block of rows, got shape {block.shape}")
+        if self.columns is None:
+            self.columns = block.shape[1]
+        elif block.shape[1] != self.columns:
+            raise ValueError(
+                f"Row width mismatch in {self.path.name}: {block.shape[1]} != {self.columns}"
+            )
+
+        self._file.write(block.tobytes())
+        self.rows += block.shape[0]
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, (self.rows, self.columns or 0)))
+        self._file.close()
+
+
+def _npy_header(dtype: np.dtype, shape: tuple[int, int]) -> bytes:
+    """Builds a version 1.0 `.npy` header padded to `_NPY_HEADER_SIZE` bytes."""
+
+    header = repr(
+        {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape}
+    )
+    prefix = np.lib.format.magic(1, 0)
+    # magic + 2 bytes for the header length, then the header terminated by a newline
+    padding = _NPY_HEADER_SIZE - len(prefix) - 2 - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Shape {shape} does not fit in the reserved .npy header")
+
+    header = header + " " * padding + "\n"
+    return prefix + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+class JsonArrayAppender(_Appender):
+    """Streams rows into a JSON array, one compact row per line."""
+
+    def __init__(self, path: Path, resume: Optional[dict] = None) -> None:
+        super().__init__(path, None, resume)
+
+    def _start(self) -> None:
+        self._file.write(b"[")
+
+    def write(self, rows: Any) -> None:
+        for row in rows:
+            if isinstance(row, np.ndarray):
+                row = row.tolist()
+            if self.columns is None:
+                self.columns = len(row)
+            self._file.write(b",\n" if self.rows else b"\n")
+            self._file.write(json.dumps(row, ensure_ascii=False).encode("utf-8"))
+            self.rows += 1
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+
+        self._file.write(b"\n]\n" if self.rows else b"]\n")
+        self._file.close()
+
+
+class VectorWriter:
+    """Writes embeddings and their source positions as batches arrive.
+
+    Supported formats:
+
+    - `json`: `result.json` with one vector per row, plus `sources.json`.
+    - `npy`: a memory-mappable `embeddings.npy` matrix (float32 or float16), plus an int64
+      `sources.npy` table.
+
+    In both cases `manifest.json` describes the files and their layout. Each row of the
+    sources table holds the record index, chunk index within the record and character
+    offset of a chunk, the embedding row holding its vector and its near-duplicate cluster.
+
+    Passing the state returned by `checkpoint` as `resume` reopens existing files and
+    continues after the last checkpointed row.
+    """
+
+    FORMATS = ("json", "npy")
+
+    def __init__(
+        self,
+        path: Path,
+        format: str = "json",
+        dtype: str = "float32",
+        resume: Optional[dict] = None,
+    ) -> None:
+        if format not in self.FORMATS:
+            raise ValueError(f"Unsupported output format: '{format}' – use one of {self.FORMATS}")
+        if np.dtype(dtype) not in (np.float32, np.float16):
+            raise ValueError(f"Unsupported output dtype: '{dtype}' – use float32 or float16")
+
+        self.path = path
+        self.format = format
+        self.dtype = np.dtype(dtype).name
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        resume = resume or {}
+        if format == "npy":
+            self._vectors = NpyAppender(
+                path / "embeddings.npy", self.dtype, resume=resume.get("vectors")
+            )
+            self._sources = NpyAppender(
+                path / "sources.npy", "int64", len(SOURCE_COLUMNS), resume.get("sources")
+            )
+        else:
+            self._vectors = JsonArrayAppender(path / "result.json", resume.get("vectors"))
+            self._sources = JsonArrayAppender(path / "sources.json", resume.get("sources"))
+
+        logger.info(
+            f"Writing {format} embeddings to {path}"
+            + (f", resuming after row {self.rows}" if resume else "")
+        )
+
+    @property
+    def rows(self) -> int:
+        return self._vectors.rows
+
+    @property
+    def source_rows(self) -> int:
+        return self._sources.rows
+
+    def checkpoint(self) -> dict[str, Any]:
+        return {"vectors": self._vectors.checkpoint(), "sources": self._sources.checkpoint()}
+
+    @property
+    def files(self) -> list[Path]:
+        return [self._vectors.path, self._sources.path, self.path / "manifest.json"]
+
+    def write(self, vectors: Sequence[Sequence[float]], sources: Sequence[Sequence[int]]) -> None:
+        """Appends a batch of embedding rows and the sources that were resolved with them."""
+
+        if len(vectors):
+            self._vectors.write(vectors)
+        if len(sources):
+            self._sources.write(sources)
+
+    def close(self, **extra: Any) -> dict[str, Any]:
+        """Finishes the output files and writes the manifest, which is also returned.
+
+        Any `extra` entries (e.g. run statistics) are added to the manifest.
+        """
+
+        self._vectors.close()
+        self._sources.close()
+
+        manifest = {
+            "format": self.format,
+            "dtype": self.dtype if self.format == "npy" else "float",
+            "rows": self._vectors.rows,
+            "dimension": self._vectors.columns,
+            "embeddings": self._vectors.path.name,
+            "sources": self._sources.path.name,
+            "source_rows": self._sources.rows,
+            "source_columns": SOURCE_COLUMNS,
+            **extra,
+        }
+        with open(self.path / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        logger.info(f"Wrote {manifest['rows']} embeddings to {self._vectors.path}")
+        return manifest
+
+
+def load_embeddings(path: Path, manifest: dict[str, Any]) -> np.ndarray:
+    """Loads the embeddings described by `manifest`; `.npy` files are memory-mapped."""
+
+    return _load(path / manifest["embeddings"], manifest["format"], np.float32)
+
+
+def load_sources(path: Path, manifest: dict[str, Any]) -> np.ndarray:
+    return _load(path / manifest["sources"], manifest["format"], np.int64).reshape(
+        -1, len(SOURCE_COLUMNS)
+    )
+
+
+def _load(path: Path, format: str, dtype: Any) -> np.ndarray:
+    if format == "npy":
+        return np.load(path, mmap_mode="r")
+    with open(path, encoding="utf-8") as f:
+        return np.asarray(json.load(f), dtype=dtype)
@@ -0,0 +1,288 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from implementation.chunking import Chunk
+from implementation.dedup import Deduplicator
+from implementation.embedding import estimate_tokens
+from implementation.metrics import SIZE_BUCKETS, Metrics
+from implementation.output import VectorWriter
+
+logger = getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+@dataclass
+class Batch:
+    """A unit of work flowing through the pipeline."""
+
+    texts: list[str] = field(default_factory=list)
+    """New chunks to embed"""
+
+    sources: list[tuple[int, ...]] = field(default_factory=list)
+    """Sources resolved since the previous batch"""
+
+    row_start: int = 0
+    """Embedding row of `texts[0]`"""
+
+    source_start: int = 0
+    """Sources row of `sources[0]`"""
+
+    records: int = 0
+    """Records consumed once this batch is written"""
+
+    tokens: int = 0
+    """Estimated tokens of `texts`"""
+
+    vectors: Optional[Sequence[Sequence[float]]] = None
+
+
+class Checkpoint:
+    """Progress of a job, persisted atomically to `checkpoint.json`.
+
+    The fingerprint identifies the input and the parameters that determine the output
+    rows; a checkpoint left by a job with a different fingerprint is ignored.
+    """
+
+    def __init__(self, path: Path, fingerprint: str) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def fingerprint_of(input_path: Path, **options: Any) -> str:
+        stat = input_path.stat()
+        key = json.dumps(
+            {"input": str(input_path), "size": stat.st_size, "mtime": stat.st_mtime, **options},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def load(self) -> Optional[dict[str, Any]]:
+        if not self.path.exists():
+            return None
+
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+
+        if state.get("fingerprint") != self.fingerprint:
+            logger.warning("Ignoring checkpoint left by a different input or configuration")
+            return None
+        return state
+
+    def save(self, state: dict[str, Any]) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, **state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class EmbeddingPipeline:
+    """Runs chunk -> embed -> write as concurrent stages connected by bounded queues.
+
+    Ingestion and chunking (with deduplication and batching) run in one thread, embedding
+    requests in another, and the calling thread writes the results; each queue holds at
+    most `queue_size` batches so memory stays bounded while the stages overlap. Batches
+    hold up to `batch_size` new chunks, or fewer once their estimated tokens reach
+    `token_budget()`.
+
+    The time each stage spends blocked on its queues is recorded in `metrics`; the stage
+    with the least waiting is the bottleneck.
+
+    Every `checkpoint_every` written batches the output files are synced and their state
+    saved. A restarted job regenerates the same deterministic stream of chunks and rows,
+    skips embedding everything up to the last checkpoint and appends after it.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[list[str]], Sequence[Sequence[float]]],
+        writer: VectorWriter,
+        dedup: Deduplicator,
+        batch_size: int = 32,
+        queue_size: int = 4,
+        checkpoint: Optional[Checkpoint] = None,
+        checkpoint_every: int = 10,
+        token_budget: Optional[Callable[[], int]] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        self.embed = embed
+        self.writer = writer
+        self.dedup = dedup
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.token_budget = token_budget
+        self.metrics = metrics or Metrics(enabled=False)
+        self.records = 0
+
+        # Rows already on disk when resuming, which are not embedded or written again
+        self._committed_rows = writer.rows
+        self._committed_sources = writer.source_rows
+
+        self._to_embed: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._to_write: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def run(self, chunks: Iterable[Chunk]) -> int:
+        """Processes `chunks` and returns the number of records consumed."""
+
+        stages = [
+            threading.Thread(target=self._stage, args=(self._produce, chunks), name="chunk"),
+            threading.Thread(target=self._stage, args=(self._embed,), name="embed"),
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            with self.metrics.phase("pipeline.write"):
+                self._write()
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._stop.set()
+            for stage in stages:
+                stage.join()
+
+        if self._error is not None:
+            raise self._error
+        return self.records
+
+    # === Stage plumbing ===
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _stage(self, target: Callable, *args: Any) -> None:
+        try:
+            with self.metrics.phase(f"pipeline.{threading.current_thread().name}"):
+                target(*args)
+        except BaseException as e:
+            logger.exception(f"Pipeline stage {threading.current_thread().name} failed: {e}")
+            self._fail(e)
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        """Blocks until `item` is queued; returns False if the pipeline is stopping."""
+
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            # Waiting for room downstream
+            stage = "chunk" if q is self._to_embed else "embed"
+            self.metrics.count("pipeline.wait_seconds", time.perf_counter() - start, stage=stage)
+
+    def _get(self, q: queue.Queue) -> Any:
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+        finally:
+            # Waiting for work upstream
+            stage = "embed" if q is self._to_embed else "write"
+            self.metrics.count("pipeline.wait_seconds", time.perf_counter() - start, stage=stage)
+
+    # === Stages ===
+
+    def _produce(self, chunks: Iterable[Chunk]) -> None:
+        batch = Batch()
+        for text, source in chunks:
+            if self._stop.is_set():
+                return
+
+            # Identical (and optionally near-identical) chunks are embedded once
+            row, cluster, new = self.dedup.add(text)
+            if new:
+                batch.texts.append(text)
+                if self.token_budget is not None:
+                    batch.tokens += estimate_tokens(text)
+            batch.sources.append((*source, row, cluster))
+            batch.records = source[0] + 1
+
+            # Runs of duplicates still flush their sources regularly
+            if (
+                len(batch.texts) >= self.batch_size
+                or len(batch.sources) >= 8 * self.batch_size
+                or (self.token_budget is not None and batch.tokens >= self.token_budget())
+            ):
+                if not self._emit(batch):
+                    return
+                batch = Batch(
+                    row_start=self.dedup.stats.unique,
+                    source_start=batch.source_start + len(batch.sources),
+                    records=batch.records,
+                )
+
+        if batch.texts or batch.sources:
+            self._emit(batch)
+        self._put(self._to_embed, _DONE)
+
+    def _emit(self, batch: Batch) -> bool:
+        if (
+            batch.row_start + len(batch.texts) <= self._committed_rows
+            and batch.source_start + len(batch.sources) <= self._committed_sources
+        ):
+            # Fully covered by the checkpoint
+            self.records = batch.records
+            self.metrics.count("pipeline.resumed_batches")
+            return True
+        self.metrics.observe("pipeline.batch_texts", len(batch.texts), SIZE_BUCKETS)
+        self.metrics.observe("pipeline.batch_sources", len(batch.sources), SIZE_BUCKETS)
+        return self._put(self._to_embed, batch)
+
+    def _embed(self) -> None:
+        while (batch := self._get(self._to_embed)) is not _DONE:
+            skip = max(0, self._committed_rows - batch.row_start)
+            texts = batch.texts[skip:]
+            batch.vectors = self.embed(texts) if texts else []
+            if len(batch.vectors) != len(texts):
+                raise RuntimeError(f"Got {len(batch.vectors)} embeddings for {len(texts)} texts")
+            if not self._put(self._to_write, batch):
+                return
+        self._put(self._to_write, _DONE)
+
+    def _write(self) -> None:
+        written = 0
+        while (batch := self._get(self._to_write)) is not _DONE:
+            skip = max(0, self._committed_sources - batch.source_start)
+            self.writer.write(batch.vectors, batch.sources[skip:])
+            self.records = batch.records
+            logger.info(f"Embedded {self.writer.rows} pieces")
+
+            written += 1
+            if self.checkpoint is not None and written % self.checkpoint_every == 0:
+                with self.metrics.phase("pipeline.checkpoint"):
+                    self.checkpoint.save(
+                        {"records": self.records, "writer": self.writer.checkpoint()}
+                    )
@@ -0,0 +1,256 @@
+# Copied verbatim into both algorithm trees (template/ and sample_timeseries_forecast/):
+# each is built into its own image from its own directory, so neither can import the
+# other's. Keep the two copies identical; tests/test_shared.py checks it.
+import gzip
+import io
+import mmap
+import os
+import queue
+import threading
+from logging import getLogger
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # Optional, only needed for zstd-compressed inputs
+    zstandard = None
+
+logger = getLogger(__name__)
+
+# Size of each sequential read, and how many of them are buffered ahead of the reader
+BLOCK_SIZE = 4 * 2**20
+READ_AHEAD = 4
+
+# How far ahead of the reader the kernel is asked to page in a memory-mapped file
+MMAP_WINDOW = 64 * 2**20
+
+MODES = ("auto", "mmap", "readahead", "direct")
+
+# File systems whose reads go over the network
+_REMOTE_FILESYSTEMS = ("nfs", "cifs", "smb", "9p", "ceph", "glusterfs", "lustre", "afs", "fuse", "davfs")
+
+_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+COMPRESSED_SUFFIXES = (".gz", ".gzip", ".zst", ".zstd")
+
+
+def compression(path: Path) -> Optional[str]:
+    """Returns `gzip` or `zstd` if the file starts with their magic bytes."""
+
+    with open(path, "rb") as f:
+        head = f.read(4)
+    return next((name for magic, name in _MAGIC.items() if head.startswith(magic)), None)
+
+
+def filesystem(path: Path) -> Optional[str]:
+    """Type of the file system holding `path` (`ext4`, `nfs4`, ...), if known."""
+
+    path = os.path.realpath(path)
+    best, kind = "", None
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount = fields[1].replace("\\040", " ")
+                inside = path == mount or path.startswith(mount.rstrip("/") + "/")
+                if inside and len(mount) >= len(best):
+                    best, kind = mount, fields[2]
+    except OSError:
+        return None
+    return kind
+
+
+def is_local(path: Path) -> bool:
+    kind = filesystem(path)
+    return kind is not None and not kind.startswith(_REMOTE_FILESYSTEMS)
+
+
+class MappedFile(io.RawIOBase):
+    """Reads a file through a memory map, asking the kernel to page in the next
+    `window` bytes ahead of the reader so parsing overlaps with the disk reads."""
+
+    def __init__(self, path: Path, window: int = MMAP_WINDOW) -> None:
+        self._file = open(path, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        self._window = window
+        self._pos = 0
+        self._advised = 0
+        if self._map is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._advise()
+
+    def _advise(self) -> None:
+        if self._map is None or not hasattr(mmap, "MADV_WILLNEED") or self._advised >= self._size:
+            return
+        # Once the reader is half-way through the advised window, advise the next one
+        if self._pos + self._window // 2 >= self._advised:
+            start = self._advised - self._advised % mmap.PAGESIZE
+            length = min(self._window, self._size - start)
+            self._map.madvise(mmap.MADV_WILLNEED, start, length)
+            self._advised = start + length
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, base + offset)
+        self._advised = max(self._advised, self._pos)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        count = max(0, min(len(buffer), self._size - self._pos))
+        if count:
+            with memoryview(self._map) as view:
+                buffer[:count] = view[self._pos : self._pos + count]
+            self._pos += count
+            self._advise()
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            if self._map is not None:
+                self._map.close()
+            self._file.close()
+        super().close()
+
+
+class ReadAhead(io.RawIOBase):
+    """Reads `source` sequentially in `block_size` reads from a background thread,
+    keeping up to `depth` blocks ready for the consumer.
+
+    While the consumer parses one block the next ones are being fetched (and
+    decompressed, if `source` decompresses), so a high-latency volume is read at its
+    throughput rather than at one round trip per small read.
+    """
+
+    def __init__(self, source: BinaryIO, block_size: int = BLOCK_SIZE, depth: int = READ_AHEAD) -> None:
+        self._source = source
+        self.block_size = block_size
+        self._blocks: queue.Queue = queue.Queue(maxsize=max(1, depth))
+        self._stopped = threading.Event()
+        self._current = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._run, name="read-ahead", daemon=True)
+        self._thread.start()
+
+    def _put(self, item: Union[bytes, BaseException]) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        try:
+            while True:
+                block = self._source.read(self.block_size)
+                if not self._put(block) or not block:
+                    return
+        except BaseException as e:
+            self._put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            if self._eof:
+                return 0
+            block = self._blocks.get()
+            if isinstance(block, BaseException):
+                self._eof = True
+                raise block
+            if not block:
+                self._eof = True
+                return 0
+            self._current = memoryview(block)
+
+        count = min(len(buffer), len(self._current))
+        buffer[:count] = self._current[:count]
+        self._current = self._current[count:]
+        return count
+
+    def close(self) -> None:
+        if not self.closed:
+            self._stopped.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
+
+
+def _decompress(source: BinaryIO, kind: Optional[str], path: Path) -> BinaryIO:
+    if kind == "gzip":
+        reader = gzip.GzipFile(fileobj=source, mode="rb")
+        # Closed along with the reader, as when GzipFile opens the file itself
+        reader.myfileobj = source
+        return reader
+    if kind == "zstd":
+        if zstandard is None:
+            raise ValueError(f"{path} is zstd-compressed, install `zstandard` to read it")
+        return zstandard.ZstdDecompressor().stream_reader(source, read_size=BLOCK_SIZE, closefd=True)
+    return source
+
+
+def _open_file(path: Path) -> BinaryIO:
+    return open(path, "rb", buffering=0)
+
+
+def open_input(
+    path: Path,
+    text: bool = False,
+    encoding: str = "utf-8-sig",
+    newline: Optional[str] = None,
+    mode: Optional[str] = None,
+    opener: Callable[[Path], BinaryIO] = _open_file,
+) -> Union[BinaryIO, io.TextIOWrapper]:
+    """Opens an input file for one sequential pass, decompressing gzip/zstd.
+
+    `mode` (`INPUT_READ`, default `auto`) picks how the bytes are read:
+    `mmap` maps the file and pages it in ahead of the reader; `readahead` issues large
+    reads from a background thread (and decompresses in another); `direct` reads it
+    plainly. `auto` maps uncompressed files on local disks and reads everything else
+    ahead. `opener` opens the unbuffered file for the other modes.
+    """
+
+    path = Path(path)
+    mode = (mode or os.getenv("INPUT_READ") or "auto").lower()
+    if mode not in MODES:
+        raise ValueError(f"Unsupported input read mode: '{mode}' – use one of {MODES}")
+
+    kind = compression(path)
+    if mode == "auto":
+        mode = "mmap" if kind is None and is_local(path) else "readahead"
+    logger.info(f"Reading {path} ({kind or 'uncompressed'}) with {mode}")
+
+    if mode == "mmap":
+        raw: BinaryIO = _decompress(MappedFile(path), kind, path)
+    elif mode == "readahead":
+        raw = ReadAhead(opener(path))
+        if kind is not None:
+            # Decompressors read in small pieces, they are served from the fetched blocks
+            raw = ReadAhead(_decompress(io.BufferedReader(raw), kind, path))
+    else:
+        raw = _decompress(opener(path), kind, path)
+
+    if not isinstance(raw, io.BufferedIOBase):
+        # Small reads are served from the map or the read-ahead blocks, no need to buffer much
+        raw = io.BufferedReader(raw)
+    if text:
+        return io.TextIOWrapper(raw, encoding=encoding, newline=newline)
+    return raw
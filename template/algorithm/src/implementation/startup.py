@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from logging import getLogger
+from typing import Iterator, Optional
+
+import requests
+
+logger = getLogger(__name__)
+
+# Fallback reference point when the entrypoint did not export the container start time
+_IMPORTED_AT = time.time()
+
+# (base_url, model) pairs already made ready by this process or the one it was forked
+# from, e.g. the daemon's; warming them up again is skipped
+_READY: set[tuple[str, str]] = set()
+
+
+def started_at() -> float:
+    """Returns when the container started (`CONTAINER_START_TS`), or when the process
+    imported this module if unknown."""
+
+    try:
+        return float(os.environ["CONTAINER_START_TS"])
+    except (KeyError, ValueError):
+        return _IMPORTED_AT
+
+
+def backoff(
+    initial: float = 0.05,
+    factor: float = 2.0,
+    maximum: float = 2.0,
+    timeout: Optional[float] = None,
+) -> Iterator[float]:
+    """Sleeps with exponentially growing delays between attempts.
+
+    Yields the elapsed time before each attempt and raises `TimeoutError` once
+    `timeout` seconds have passed.
+    """
+
+    start = time.monotonic()
+    delay = initial
+    while True:
+        elapsed = time.monotonic() - start
+        yield elapsed
+        if timeout is not None and elapsed + delay > timeout:
+            raise TimeoutError(f"Gave up after {elapsed:.1f}s")
+        time.sleep(delay)
+        delay = min(delay * factor, maximum)
+
+
+def _has_model(tags: list[str], model: str) -> Optional[str]:
+    return next((tag for tag in tags if tag == model or tag.startswith(f"{model}:")), None)
+
+
+class ModelWarmup:
+    """Gets an Ollama embedding model ready in a background thread.
+
+    The server is probed with exponential backoff, the model is pulled if missing and
+    then preloaded (`keep_alive`) so the first real request does not pay the load time.
+    Everything else (reading and chunking the input) can run meanwhile; only the first
+    embedding call has to `wait` for it.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str,
+        keep_alive: str = "30m",
+        timeout: float = 600,
+    ) -> None:
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.timings: dict[str, float] = {}
+
+        self._session = requests.Session()
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+
+    def start(self) -> "ModelWarmup":
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Blocks until the model is ready, re-raising any error from the warm-up."""
+
+        if not self._ready.wait(self.timeout if timeout is None else timeout):
+            raise TimeoutError(f"Model '{self.model}' was not ready after {self.timeout}s")
+        if self._error is not None:
+            raise self._error
+
+    def _mark(self, name: str) -> None:
+        self.timings[name] = round(time.time() - started_at(), 3)
+        logger.info(f"Startup: {name} at {self.timings[name]}s since container start")
+
+    def _run(self) -> None:
+        try:
+            if (self.base_url, self.model) in _READY:
+                logger.info(f"Model '{self.model}' was already prepared by this process")
+                self._mark("model_loaded")
+                return
+            self._wait_for_server()
+            self._ensure_model()
+            self._preload()
+            _READY.add((self.base_url, self.model))
+        except BaseException as e:
+            logger.exception(f"Could not prepare model '{self.model}': {e}")
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def _wait_for_server(self) -> None:
+        logger.info(f"Waiting for Ollama at {self.base_url}")
+        for _ in backoff(timeout=self.timeout):
+            try:
+                self._session.get(f"{self.base_url}/api/version", timeout=2).raise_for_status()
+                break
+            except requests.RequestException:
+                continue
+        self._mark("server_ready")
+
+    def _tags(self) -> list[str]:
+        resp = self._session.get(f"{self.base_url}/api/tags", timeout=30)
+        resp.raise_for_status()
+        return [t.get("model") for t in resp.json().get("models", []) if isinstance(t, dict)]
+
+    def _ensure_model(self) -> None:
+        tags = self._tags()
+        logger.info(f"Available models before pull: {tags}")
+
+        if matched := _has_model(tags, self.model):
+            logger.info(f"Model '{self.model}' already available as '{matched}'")
+            self._mark("model_available")
+            return
+
+        logger.info(f"Model '{self.model}' not found; pulling now…")
+        with self._session.post(
+            f"{self.base_url}/api/pull",
+            json={"model": self.model, "stream": True},
+            stream=True,
+        ) as pull_resp:
+            pull_resp.raise_for_status()
+            for raw in pull_resp.iter_lines():
+                if not raw:
+                    continue
+                line = raw.decode("utf-8", errors="ignore")
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    msg = {"status": line}
+                if "error" in msg:
+                    raise RuntimeError(f"Failed to pull Ollama model '{self.model}': {msg['error']}")
+                logger.debug(f"Pull progress: {msg.get('status')}")
+                if msg.get("status") == "success":
+                    logger.info(f"Model '{self.model}' pulled successfully")
+                    break
+
+        if not _has_model(self._tags(), self.model):
+            logger.error(f"Model '{self.model}' failed to download")
+            raise RuntimeError(f"Failed to pull Ollama model '{self.model}'")
+        self._mark("model_available")
+
+    def _preload(self) -> None:
+        # An empty input only loads the model into memory
+        try:
+            self._session.post(
+                f"{self.base_url}/api/embed",
+                json={"model": self.model, "input": [], "keep_alive": self.keep_alive},
+                timeout=self.timeout,
+            ).raise_for_status()
+            self._mark("model_loaded")
+        except requests.RequestException as e:
+            # Not fatal, the first embedding request loads the model instead
+            logger.warning(f"Could not preload model '{self.model}': {e}")
@@ -0,0 +1,202 @@
+"""A local stand-in for the Ollama HTTP API, for tests and benchmarks.
+
+It implements `/api/version`, `/api/tags`, `/api/pull` and `/api/embed` with
+configurable latency, jitter and failure rate. Vectors are derived from a hash of the
+text, so the same text always gets the same vector.
+
+Run from `template/algorithm` to use it in place of Ollama:
+
+    python tests/fake_ollama.py --port 11434 --latency 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class FakeOllama:
+    def __init__(
+        self,
+        models: Iterable[str] = ("nomic-embed-text:latest",),
+        dimension: int = 768,
+        latency: float = 0.0,
+        per_token: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        context_length: int = 2048,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.models = list(models)
+        self.dimension = dimension
+        self.latency = latency
+        self.per_token = per_token
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.context_length = context_length
+
+        self.latencies: list[float] = []
+        """Service time of every successful embed request, in seconds"""
+        self.failures = 0
+        self.tokens = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def vector(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def has_model(self, model: str) -> bool:
+        return any(tag == model or tag.startswith(f"{model}:") for tag in self.models)
+
+    # === Endpoints, returning (status, body) ===
+
+    def tags(self) -> tuple[int, Any]:
+        return 200, {"models": [{"name": tag, "model": tag} for tag in self.models]}
+
+    def pull(self, body: dict) -> tuple[int, Any]:
+        model = body.get("model", "")
+        if not self.has_model(model):
+            self.models.append(model if ":" in model else f"{model}:latest")
+        return 200, [{"status": "pulling manifest"}, {"status": "verifying"}, {"status": "success"}]
+
+    def embed(self, body: dict) -> tuple[int, Any]:
+        if not self.has_model(body.get("model", "")):
+            return 404, {"error": f"model '{body.get('model')}' not found"}
+
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        counts = [len(_TOKEN_PATTERN.findall(text)) for text in texts]
+        context = (body.get("options") or {}).get("num_ctx", self.context_length)
+        if body.get("truncate") is False and any(count > context for count in counts):
+            return 400, {"error": "the input length exceeds the context length"}
+
+        with self._lock:
+            fail = self._random.random() < self.failure_rate
+            jitter = self._random.uniform(0, self.jitter)
+        seconds = self.latency + self.per_token * sum(counts) + jitter
+        time.sleep(seconds)
+        if fail:
+            with self._lock:
+                self.failures += 1
+            return 503, {"error": "server busy"}
+
+        with self._lock:
+            self.latencies.append(seconds)
+            self.tokens += sum(counts)
+        return 200, {
+            "model": body["model"],
+            "embeddings": [self.vector(text) for text in texts],
+            "total_duration": int(seconds * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": sum(counts),
+        }
+
+
+def _handler(ollama: FakeOllama) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; without this every response waits
+        # for the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path == "/api/version":
+                self._send(200, {"version": "0.0.0-fake"})
+            elif self.path == "/api/tags":
+                self._send(*ollama.tags())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/api/pull":
+                self._send(*ollama.pull(body))
+            elif self.path == "/api/embed":
+                self._send(*ollama.embed(body))
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _send(self, status: int, body: Any) -> None:
+            # Lists are streamed as JSON lines, like Ollama's progress responses
+            if isinstance(body, list):
+                data = b"".join(json.dumps(line).encode("utf-8") + b"\n" for line in body)
+                content_type = "application/x-ndjson"
+            else:
+                data = json.dumps(body).encode("utf-8")
+                content_type = "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", nargs="*", default=[])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--per-token", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeOllama(
+        models=args.model,
+        dimension=args.dim,
+        latency=args.latency,
+        per_token=args.per_token,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        host="0.0.0.0",
+        port=args.port,
+    )
+    print(f"Fake Ollama listening on port {args.port}")
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
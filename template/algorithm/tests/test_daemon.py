@@ -0,0 +1,138 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Append relative src directory to path
+sys.path.append("src")
+
+from oceanprotocol_job_details.config import config
+from src.implementation.daemon import Daemon, Spool, apply_job
+
+# Set once before the daemon forks, as an expensive import or model handshake would be
+_WARM: dict[str, float] = {}
+
+
+def _job() -> None:
+    """Writes what the job saw to its outputs directory."""
+
+    outputs = Path(config.path_outputs)
+    outputs.mkdir(parents=True, exist_ok=True)
+    dids = json.loads(os.environ["DIDS"])
+    (outputs / "seen.json").write_text(json.dumps({"dids": dids, "warm": _WARM}))
+    if dids == ["fail"]:
+        raise RuntimeError("bad input")
+    if dids == ["exit"]:
+        sys.exit(3)
+    if dids == ["hang"]:
+        time.sleep(60)
+
+
+def _serve(spool: Spool, jobs: int, **kwargs) -> int:
+    return Daemon(spool, _job, cold_start_seconds=1.5, poll=0.01, **kwargs).serve(max_jobs_total=jobs)
+
+
+def test_spool_round_trip(tmp_path):
+    _WARM["at"] = 1.0
+    spool = Spool(tmp_path / "spool")
+    ids = [
+        spool.submit({"dids": [f"did-{i}"], "transformation_did": "1234", "data": str(tmp_path / f"job-{i}")})
+        for i in range(3)
+    ]
+    assert _serve(spool, 3, max_jobs=2) == 3
+
+    for i, job_id in enumerate(ids):
+        report = spool.result(job_id, timeout=1)
+        assert report["exit_code"] == 0
+        assert report["signal"] is None
+        assert report["cold_start_seconds"] == 1.5
+        assert report["estimated_cold_seconds"] >= report["latency_seconds"] + 1.5 - 0.001
+        assert (spool.done / f"{job_id}.log").exists()
+
+        seen = json.loads((tmp_path / f"job-{i}" / "outputs" / "seen.json").read_text())
+        assert seen == {"dids": [f"did-{i}"], "warm": {"at": 1.0}}
+
+    assert not any(spool.incoming.iterdir())
+    assert not any(spool.running.iterdir())
+    # Jobs ran in children, the daemon's own configuration is untouched
+    assert config.path_outputs == "/data/outputs"
+
+
+def test_failing_jobs(tmp_path):
+    spool = Spool(tmp_path / "spool")
+    paths = {"outputs": str(tmp_path / "outputs")}
+    broken = spool.incoming / "broken.json"
+    broken.write_text("{")
+    os.utime(broken, (0, 0))
+    failed = spool.submit({"dids": ["fail"], "paths": paths})
+    exited = spool.submit({"dids": ["exit"], "paths": paths})
+    hung = spool.submit({"dids": ["hang"], "paths": paths})
+
+    assert _serve(spool, 3, job_timeout=0.5) == 3
+
+    assert spool.result(failed, timeout=1)["exit_code"] == 1
+    assert "bad input" in (spool.done / f"{failed}.log").read_text()
+    assert spool.result(exited, timeout=1)["exit_code"] == 3
+    assert spool.result(hung, timeout=1)["signal"] == 9
+    assert spool.result("broken", timeout=1)["exit_code"] is None
+
+
+def test_claim_skips_descriptors_claimed_meanwhile(tmp_path, monkeypatch):
+    spool = Spool(tmp_path / "spool")
+    gone = spool.submit({"dids": ["a"]})
+    kept = spool.submit({"dids": ["b"]})
+    glob = Path.glob
+
+    def racing_glob(self, pattern):
+        paths = list(glob(self, pattern))
+        # Another daemon takes one between the listing and the claim
+        (spool.incoming / f"{gone}.json").unlink(missing_ok=True)
+        return iter(paths)
+
+    monkeypatch.setattr(Path, "glob", racing_glob)
+    job_id, descriptor, submitted = spool.claim()
+
+    assert (job_id, descriptor) == (kept, {"dids": ["b"]})
+    assert submitted == (spool.running / f"{kept}.json").stat().st_mtime
+    assert spool.claim() is None
+
+
+def test_apply_job(monkeypatch):
+    monkeypatch.setattr(config, "path_outputs", config.path_outputs)
+    monkeypatch.setattr(config, "path_logs", config.path_logs)
+    monkeypatch.setenv("DIDS", "[]")
+    monkeypatch.setenv("BASE_URL", "")
+
+    apply_job({"dids": ["a", "b"], "paths": {"outputs": "/tmp/out"}, "env": {"BASE_URL": "http://x"}})
+    assert json.loads(os.environ["DIDS"]) == ["a", "b"]
+    assert os.environ["BASE_URL"] == "http://x"
+    assert config.path_outputs == "/tmp/out"
+    assert config.path_logs == "/data/logs"
+
+
+def test_main_exits_non_zero_on_failure(monkeypatch):
+    from pytest import raises
+    from src import main
+
+    class Failing:
+        def __init__(self, job_details) -> None:
+            pass
+
+        def run(self):
+            raise RuntimeError("bad input")
+
+        def save_result(self, path) -> None:
+            pass
+
+    monkeypatch.setattr(main, "OceanProtocolJobDetails", lambda parameters: SimpleNamespace(load=lambda: None))
+    monkeypatch.setattr(main, "Algorithm", Failing)
+    with raises(SystemExit) as exited:
+        main.main()
+    assert exited.value.code == 1
+
+    monkeypatch.setattr(Failing, "run", lambda self: self)
+    with raises(SystemExit) as exited:
+        main.main()
+    assert exited.value.code == 0
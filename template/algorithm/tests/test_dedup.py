@@ -0,0 +1,76 @@
+import sys
+
+# Append relative src directory to path
+sys.path.append("src")
+
+from src.implementation.chunking import split_records
+from src.implementation.dedup import Deduplicator, MinHashLSH
+
+SIGNATURE = (
+    "Regards,\nPhillip Allen\n\nThis e-mail is the property of Enron Corp. and/or its relevant "
+    "affiliate and may contain confidential and privileged material for the sole use of the "
+    "intended recipient(s). Any review, use, distribution or disclosure by others is strictly "
+    "prohibited. If you are not the intended recipient (or authorized to receive for the "
+    "recipient), please contact the sender or reply to Enron Corp. and delete all copies."
+)
+
+
+def test_parallel_chunking_preserves_order():
+    records = [{"id": i, "message": f"message {i} " * (i % 7 * 50)} for i in range(300)]
+
+    serial = list(split_records(records, chunk_size=256, chunk_overlap=20, workers=1))
+    parallel = list(split_records(iter(records), chunk_size=256, chunk_overlap=20, workers=3))
+
+    assert parallel == serial
+    assert {source[0] for _, source in serial} == set(range(300))
+
+
+def test_duplicates_share_a_row():
+    dedup = Deduplicator()
+    chunks = ["a", SIGNATURE, "b", SIGNATURE, "a", SIGNATURE]
+
+    rows = [dedup.add(chunk)[::2] for chunk in chunks]
+
+    assert rows == [(0, True), (1, True), (2, True), (1, False), (0, False), (1, False)]
+    assert dedup.report() == {"chunks": 6, "unique": 3, "near_duplicates": 0, "saved": 3}
+
+
+def test_disabled_dedup_embeds_everything():
+    dedup = Deduplicator(enabled=False)
+
+    rows = [dedup.add(SIGNATURE) for _ in range(3)]
+
+    assert rows == [(0, 0, True), (1, 1, True), (2, 2, True)]
+    assert dedup.stats.saved == 0
+
+
+def test_minhash_estimates_jaccard():
+    lsh = MinHashLSH(threshold=0.8)
+    edited = SIGNATURE.replace("Phillip", "Phil")
+    unrelated = "Gas prices in California are expected to rise sharply this winter. " * 5
+
+    original = lsh.signature(SIGNATURE)
+
+    assert (lsh.signature(SIGNATURE) == original).all()
+    assert (lsh.signature(edited) == original).mean() > 0.8
+    assert (lsh.signature(unrelated) == original).mean() < 0.2
+
+
+def test_near_duplicates_are_skipped():
+    dedup = Deduplicator(near=MinHashLSH(threshold=0.8))
+    edited = SIGNATURE.replace("Phillip", "Phil")
+
+    assert dedup.add(SIGNATURE) == (0, 0, True)
+    assert dedup.add("something else entirely") == (1, 1, True)
+    assert dedup.add(edited) == (0, 0, False)
+    assert dedup.add(edited) == (0, 0, False)
+    assert dedup.stats.to_dict() == {"chunks": 4, "unique": 2, "near_duplicates": 1, "saved": 2}
+
+
+def test_near_duplicates_are_tagged():
+    dedup = Deduplicator(near=MinHashLSH(threshold=0.8), near_mode="tag")
+    edited = SIGNATURE.replace("Phillip", "Phil")
+
+    assert dedup.add(SIGNATURE) == (0, 0, True)
+    assert dedup.add(edited) == (1, 0, True)
+    assert dedup.stats.saved == 0
@@ -0,0 +1,122 @@
+import sys
+import time
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from ollama import ResponseError
+from pytest import raises
+from src.implementation.chunking import split_records
+from src.implementation.embedding import AdaptiveBatcher, estimate_tokens
+
+
+class FakeServer:
+    """Embeds texts as (length, 1) and rejects requests over the context."""
+
+    def __init__(self, context_length: int, fail: int = 0, seconds_per_token=None) -> None:
+        self.context_length = context_length
+        self.fail = fail
+        self.seconds_per_token = seconds_per_token
+        self.requests: list[list[str]] = []
+
+    def __call__(self, texts):
+        if self.fail:
+            self.fail -= 1
+            raise ResponseError("server overloaded", 503)
+        tokens = [estimate_tokens(text) for text in texts]
+        if max(tokens) > self.context_length:
+            raise ResponseError("input length exceeds the context length", 400)
+        self.requests.append(texts)
+        if self.seconds_per_token:
+            time.sleep(self.seconds_per_token(sum(tokens)) * sum(tokens))
+        return [[float(len(text)), 1.0] for text in texts], sum(tokens)
+
+
+def test_estimate_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hello world") == 4
+    assert estimate_tokens('{"a": 1}') == 7
+    assert estimate_tokens("x" * 40) == 10
+
+
+def test_packs_requests_up_to_budget():
+    server = FakeServer(context_length=64)
+    batcher = AdaptiveBatcher(server, context_length=64, budget=100, max_texts=8)
+    texts = [f"word{i} " * 10 for i in range(40)]
+
+    vectors = batcher(texts)
+
+    assert vectors == [[float(len(text)), 1.0] for text in texts]
+    assert len(server.requests) < len(texts)
+    assert all(len(request) <= 8 for request in server.requests)
+
+
+def test_oversize_texts_are_split_not_truncated():
+    server = FakeServer(context_length=32)
+    batcher = AdaptiveBatcher(server, context_length=32)
+
+    vectors = batcher(["short", "lorem ipsum " * 40])
+
+    assert len(vectors) == 2
+    assert batcher.stats["splits"] > 0
+    assert np.isclose(np.linalg.norm(vectors[1]), 1)
+
+
+def test_retries_transient_failures(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    server = FakeServer(context_length=64, fail=2)
+    batcher = AdaptiveBatcher(server, context_length=64, budget=256)
+
+    assert len(batcher(["a b c"] * 10)) == 10
+    assert batcher.stats["retries"] == 2
+    assert batcher.budget < 256 + 64
+
+
+def test_gives_up_after_retries(monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    batcher = AdaptiveBatcher(FakeServer(context_length=64, fail=10), context_length=64, retries=1)
+
+    with raises(ResponseError):
+        batcher(["a"])
+
+
+def test_budget_grows_until_the_server_slows_down():
+    # Requests over 300 tokens take ten times longer per token
+    server = FakeServer(
+        context_length=64, seconds_per_token=lambda tokens: 1e-5 if tokens <= 300 else 1e-4
+    )
+    batcher = AdaptiveBatcher(server, context_length=64, budget=64, max_texts=1000)
+
+    for _ in range(30):
+        batcher(["tok " * 50] * 20)
+
+    assert 64 <= batcher.budget <= 300 * 1.5
+
+
+def test_token_chunks_fit_the_context():
+    records = [{"text": "lorem ipsum dolor sit amet " * 200}]
+
+    chunks = list(
+        split_records(
+            records, chunk_size=128, chunk_overlap=16, workers=1, length_function=estimate_tokens
+        )
+    )
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(text) <= 128 for text, _ in chunks)
+
+
+def test_dead_server_fails_after_one_retry_budget(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    server = FakeServer(context_length=64, fail=10**6)
+    batcher = AdaptiveBatcher(server, context_length=64, budget=10_000, max_texts=256, retries=3)
+
+    with raises(ResponseError):
+        batcher(["a b c"] * 256)
+
+    # One request plus its retries, not one per bisected half
+    assert server.fail == 10**6 - 4
+    assert batcher.stats["retries"] == 3
+    assert sleeps == [0.5, 1, 2]
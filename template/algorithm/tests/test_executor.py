@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Append relative src directory to path
+sys.path.append("src")
+
+from src.implementation.executor import FileExecutor, FileTask
+
+
+def _tasks(n: int, size: int = 100) -> list[FileTask]:
+    return [FileTask(f"did{i % 2}", Path(f"file{i}.json"), size) for i in range(n)]
+
+
+def test_reports_in_order_and_isolates_failures():
+    def work(task: FileTask) -> int:
+        if task.path.name == "file3.json":
+            raise ValueError("broken shard")
+        return int(task.path.stem[4:])
+
+    reports = FileExecutor(workers=3).map(work, _tasks(6))
+
+    assert [report.file for report in reports] == [f"file{i}.json" for i in range(6)]
+    assert [report.status for report in reports] == ["ok"] * 3 + ["failed"] + ["ok"] * 2
+    assert reports[3].error == "ValueError: broken shard"
+    assert [report.value for report in reports if report.status == "ok"] == [0, 1, 2, 4, 5]
+
+
+def test_admission_respects_workers_and_memory():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work(task: FileTask) -> None:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    FileExecutor(workers=8, memory_budget=250).map(work, _tasks(10, size=100))
+    assert peak == 2
+
+    peak = 0
+    FileExecutor(workers=3, memory_budget=None).map(work, _tasks(10, size=100))
+    assert peak == 3
+
+
+def test_oversized_file_still_runs():
+    reports = FileExecutor(workers=2, memory_budget=10).map(lambda task: task.size, _tasks(2))
+
+    assert [report.value for report in reports] == [100, 100]
+
+
+def test_job_files_order_and_missing_inputs(tmp_path):
+    from types import SimpleNamespace
+
+    from src.implementation.executor import job_files
+
+    for name in ("2", "10", "1"):
+        (tmp_path / name).write_text("x" * int(name))
+    files = SimpleNamespace(
+        files=[
+            SimpleNamespace(did="did-b", input_files=[tmp_path / "10", tmp_path / "2", tmp_path / "1"]),
+            SimpleNamespace(did="did-a", input_files=[tmp_path / "missing"]),
+        ]
+    )
+
+    tasks = job_files(files)
+
+    # Numeric shard names in numeric order, DIDs in the given order
+    assert [(task.did, task.path.name, task.size) for task in tasks] == [
+        ("did-b", "1", 1),
+        ("did-b", "2", 2),
+        ("did-b", "10", 10),
+        ("did-a", "missing", 0),
+    ]
+    reports = FileExecutor(workers=2).map(lambda task: task.path.read_text(), tasks)
+    assert [report.status for report in reports] == ["ok", "ok", "ok", "failed"]
+    assert reports[3].error.startswith("FileNotFoundError")
@@ -0,0 +1,99 @@
+import sys
+from pathlib import Path
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from pytest import fixture, mark, raises
+from src.implementation.index import build_index, load_index, normalize
+
+
+@fixture(scope="module")
+def vectors() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 32))
+    return (centers[rng.integers(0, 20, 2000)] + 0.3 * rng.normal(size=(2000, 32))).astype(
+        np.float32
+    )
+
+
+def _brute_force(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = normalize(queries) @ normalize(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def test_exact_index_matches_brute_force(vectors, monkeypatch):
+    from src.implementation import index as index_module
+
+    # Force several blocks to exercise the running top-k merge
+    monkeypatch.setattr(index_module, "BLOCK_SIZE", 300)
+    queries = vectors[:25] + 0.01
+
+    ids, scores = build_index("exact", vectors).search(queries, k=10)
+
+    assert ids.shape == scores.shape == (25, 10)
+    assert (ids == _brute_force(vectors, queries, 10)).all()
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+def test_ivf_index_recall(vectors):
+    queries = vectors[::50] + 0.05
+    expected = _brute_force(vectors, queries, 10)
+
+    ids, _ = build_index("ivf", vectors, nlist=20, nprobe=4).search(queries, k=10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ids, expected)])
+
+    assert recall > 0.9
+
+
+def test_save_and_load(vectors, tmp_path):
+    index = build_index("ivf", vectors, nlist=16, nprobe=3)
+    index.save(Path(tmp_path))
+
+    loaded = load_index(Path(tmp_path))
+
+    assert isinstance(loaded.vectors, np.memmap)
+    assert (loaded.search(vectors[:5], k=3)[0] == index.search(vectors[:5], k=3)[0]).all()
+
+
+def test_unknown_index(vectors):
+    with raises(ValueError):
+        build_index("hnsw", vectors)
+
+
+@mark.parametrize("kind, ratio, rescore", [("int8", 4, 4), ("binary", 32, 10)])
+def test_quantized_index_recall_and_memory(vectors, tmp_path, kind, ratio, rescore):
+    queries = vectors[::50] + 0.05
+    expected = _brute_force(vectors, queries, 10)
+
+    index = build_index(kind, vectors, rescore=rescore)
+    index.save(Path(tmp_path))
+    loaded = load_index(Path(tmp_path))
+    ids, scores = loaded.search(queries, k=10)
+    recall = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(ids, expected)])
+
+    assert vectors.nbytes / loaded.codes.nbytes == ratio
+    assert isinstance(loaded.vectors, np.memmap)
+    assert recall > 0.9
+    assert (np.diff(scores, axis=1) <= 0).all()
+
+
+@mark.parametrize("kind", ["exact", "ivf", "int8", "binary"])
+def test_save_points_at_the_embeddings(vectors, tmp_path, kind, monkeypatch):
+    from src.implementation import index as index_module
+
+    # Norms are computed over several blocks
+    monkeypatch.setattr(index_module, "BLOCK_SIZE", 300)
+    np.save(tmp_path / "embeddings.npy", vectors)
+    embeddings = np.load(tmp_path / "embeddings.npy", mmap_mode="r")
+    queries = vectors[::100] + 0.05
+
+    index = build_index(kind, embeddings)
+    index.save(tmp_path / "index")
+    loaded = load_index(tmp_path / "index")
+
+    # The float vectors are not written a second time
+    assert not (tmp_path / "index" / "vectors.npy").exists()
+    assert Path(loaded.vectors.filename) == (tmp_path / "embeddings.npy").resolve()
+    assert (loaded.search(queries, k=5)[0] == index.search(queries, k=5)[0]).all()
@@ -0,0 +1,102 @@
+import csv
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Append relative src directory to path
+sys.path.append("src")
+
+from pytest import mark, raises
+from src.implementation import ingest
+from src.implementation.ingest import iter_records, sniff_format
+
+SAMPLE = Path("src/implementation/testdata.json")
+
+
+@mark.parametrize("read_size", [7, 1024, 64 * 1024])
+def test_json_array_matches_json_load(monkeypatch, read_size):
+    monkeypatch.setattr(ingest, "READ_SIZE", read_size)
+
+    with open(SAMPLE, encoding="utf-8") as f:
+        expected = json.load(f)
+
+    assert list(iter_records(SAMPLE)) == expected
+
+
+def test_json_array_numbers_across_reads(monkeypatch, tmp_path):
+    text = '[1, 2.5, -3e-02, 10, 0.125e3, 1.5E+3, true, null, "x", {"n": 4.25}]'
+    records = json.loads(text)
+    path = tmp_path / "numbers.json"
+    path.write_text(text)
+
+    # Every read size splits some number at its `.`, `e` or sign
+    for read_size in range(1, 16):
+        monkeypatch.setattr(ingest, "READ_SIZE", read_size)
+        assert list(iter_records(path)) == records
+
+    # A number cut at its `.` by the default read size
+    monkeypatch.undo()
+    path.write_text('["' + "a" * (ingest.READ_SIZE - 7) + '", 2.5, 3]')
+    assert list(iter_records(path))[1:] == [2.5, 3]
+
+
+def test_sniffs_formats_without_extension(tmp_path):
+    records = [{"name": "a", "value": 1}, {"name": "b", "value": 2.5}]
+
+    (tmp_path / "array").write_text(json.dumps(records, indent=2))
+    (tmp_path / "object").write_text(json.dumps(records[0], indent=2))
+    (tmp_path / "lines").write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    with open(tmp_path / "table", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "value"])
+        writer.writeheader()
+        writer.writerows(records)
+
+    assert sniff_format(tmp_path / "array") == "json"
+    assert sniff_format(tmp_path / "object") == "json"
+    assert sniff_format(tmp_path / "lines") == "jsonl"
+    assert sniff_format(tmp_path / "table") == "csv"
+
+    for name in ("array", "lines", "table"):
+        assert list(iter_records(tmp_path / name)) == records
+    assert list(iter_records(tmp_path / "object")) == records[:1]
+
+
+def test_invalid_inputs(tmp_path):
+    (tmp_path / "data.txt").write_text("hello")
+    (tmp_path / "scalar.json").write_text("42")
+    (tmp_path / "truncated.json").write_text('[{"a": 1}, {"a": ')
+
+    with raises(ValueError):
+        iter_records(tmp_path / "data.txt")
+    with raises(ValueError):
+        list(iter_records(tmp_path / "scalar.json"))
+    with raises(ValueError):
+        list(iter_records(tmp_path / "truncated.json"))
+
+
+def test_csv_values_coerced_like_pandas(tmp_path):
+    path = tmp_path / "values.csv"
+    path.write_text("a,b,c,d,e,f,g\n7,-2.5,1e3,inf,,1_000,\u0663\n", encoding="utf-8")
+
+    record = next(iter_records(path))
+    assert {key: record[key] for key in "abcde"} == {"a": 7, "b": -2.5, "c": 1000.0, "d": float("inf"), "e": None}
+    assert type(record["a"]) is int and type(record["c"]) is float
+    # Kept as text by `pd.read_csv`, though `int()` accepts them
+    assert record["f"] == "1_000"
+    assert record["g"] == "\u0663"
+
+
+def test_json_array_memory_is_bounded(tmp_path):
+    path = tmp_path / "large.json"
+    record = {"text": "x" * 1000}
+    with open(path, "w") as f:
+        f.write("[" + ",".join(json.dumps(record) for _ in range(5000)) + "]")
+
+    tracemalloc.start()
+    count = sum(1 for _ in iter_records(path))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == 5000
+    assert peak < path.stat().st_size / 10
@@ -1,100 +1,127 @@
+import json
 import sys
 from pathlib import Path
-
-from oceanprotocol_job_details.ocean import JobDetails
+from types import SimpleNamespace
 
 # Append relative src directory to path
 sys.path.append("src")
 
-import warnings
 from typing import Optional
 
-from oceanprotocol_job_details.job_details import OceanProtocolJobDetails
-from pytest import fixture, mark
+from pytest import fixture
 from src.implementation.algorithm import Algorithm
-from src.implementation.data import InputParameters
+from tests.fake_ollama import FakeOllama
 
-warnings.filterwarnings("ignore", category=FutureWarning)
+INPUT = Path("src/implementation/testdata.json")
 
-job_details: JobDetails[InputParameters]
+server: FakeOllama
 algorithm: Optional[Algorithm]
 
 
-@fixture(scope="session", autouse=True)
-def setup():
-    """Setup code that will run before the first test in this module."""
-
-    global job_details, algorithm
-
-    job_details = OceanProtocolJobDetails(InputParameters).load()
-    algorithm = Algorithm(job_details)
-
-    yield
-
-    print("End of testing session ...")
+@fixture(scope="module", autouse=True)
+def setup(tmp_path_factory):
+    """Runs the algorithm once against a fake Ollama that has to pull the model first and
+    fails some requests."""
 
+    global server, algorithm
 
-def test_details():
-    assert job_details is not None
+    with FakeOllama(models=[], dimension=16, latency=0.001, failure_rate=0.1, seed=3) as server:
+        files = SimpleNamespace(files=[SimpleNamespace(input_files=[INPUT])])
+        job_details = SimpleNamespace(
+            files=files,
+            parameters={
+                "base_url": server.url,
+                "output_dir": str(tmp_path_factory.mktemp("outputs")),
+                "metrics_dir": str(tmp_path_factory.mktemp("logs")),
+                "openmetrics": True,
+                "chunk_workers": 1,
+                "query": ["Cras dictum dolor", "Maecenas quis nisi nunc"],
+            },
+        )
+        algorithm = Algorithm(job_details)
+        yield
 
 
 def test_main():
     assert algorithm.run() is not None
+    assert server.has_model("nomic-embed-text")
+    assert server.failures > 0
 
 
 def test_main_results():
-    assert algorithm.results is not None
+    assert algorithm.results["rows"] > 0
+    assert algorithm.results["dimension"] == 16
+    assert algorithm.results["batching"]["retries"] == server.failures
 
 
 def test_output(tmp_path):
-    """Test that the algorithm output contains the necessary files to make predictions
-    and that it's possible to load the model and make predictions.
-    """
-
     tmp = Path(tmp_path)
     algorithm.save_result(tmp)
 
-    assert (tmp / "parameters.json").exists()
-    assert (tmp / "scores.csv").exists()
-    assert (tmp / "timeseries_features.pkl").exists()
-    assert (tmp / "model.pkl").exists()
-    assert (tmp / "plot.png").exists()
-
-
-@mark.filterwarnings("ignore::FutureWarning")
-@mark.filterwarnings("error")
-def test_can_predict(tmp_path):
-    import pandas as pd
-
-    def load_model(path: Path):
-        import cloudpickle
-
-        with open(path, "rb") as f:
-            return cloudpickle.load(f)
-
-    tmp = Path(tmp_path)
-    algorithm.save_result(tmp)
-
-    # Load the pipelines
-    ts_features = load_model(tmp / "timeseries_features.pkl")
-    model = load_model(tmp / "model.pkl")
-
-    # Load the data
-    df: pd.DataFrame = algorithm._df
-
-    try:
-        df = ts_features.transform(df)
-    except Exception as e:
-        raise Exception("Error transforming the data") from e
-
-    # Hardcoded because the end-user should know :)
-    target_column = "Sales"
-    X_df = df.drop(columns=[target_column])
-
-    # Make predictions
-    try:
-        predictions = model.predict(X_df.to_numpy())
-    except Exception as e:
-        raise Exception("Error predicting") from e
-
-    assert predictions is not None
+    assert (tmp / "result.json").exists()
+    assert (tmp / "sources.json").exists()
+    assert (tmp / "manifest.json").exists()
+    assert (tmp / "query_results.json").exists()
+
+    records = json.loads(INPUT.read_text(encoding="utf-8"))
+    sources = json.loads((tmp / "sources.json").read_text(encoding="utf-8"))
+    assert max(source[0] for source in sources) == len(records) - 1
+
+    # Every record fits one chunk, so the first row is the embedding of the first record
+    vectors = json.loads((tmp / "result.json").read_text(encoding="utf-8"))
+    assert vectors[0] == server.vector(json.dumps(records[0], ensure_ascii=False))
+
+
+def test_metrics():
+    logs = Path(algorithm._job_details.parameters["metrics_dir"])
+    metrics = json.loads((logs / "metrics.json").read_text(encoding="utf-8"))
+
+    assert {"run", "pipeline", "index", "query", "save_result"} <= metrics["phases"].keys()
+    assert metrics["counters"]["embed.retries"] == server.failures
+    requests = metrics["histograms"]["embed.request_seconds"]
+    # The server also saw the request preloading the model
+    assert requests["count"] == len(server.latencies) - 1
+    assert requests["p50"] <= requests["p99"]
+    assert metrics["gauges"]["dedup.hit_rate"] > 0
+    assert metrics["gauges"]['output.bytes{file="result.json"}'] > 0
+    assert (logs / "metrics.prom").read_text(encoding="utf-8").endswith("# EOF\n")
+
+
+def test_every_file_of_every_did(tmp_path):
+    records = json.loads(INPUT.read_text(encoding="utf-8"))
+    shards = []
+    parts = [("a", "0.json", records[:40]), ("a", "1.json", records[40:80]), ("b", "0.json", records[80:])]
+    for did, name, part in parts:
+        (tmp_path / did).mkdir(exist_ok=True)
+        shards.append((did, tmp_path / did / name))
+        shards[-1][1].write_text(json.dumps(part), encoding="utf-8")
+    (tmp_path / "b" / "broken.csv").write_bytes(b"\xff\xfe")
+    shards.append(("b", tmp_path / "b" / "broken.csv"))
+    (tmp_path / "out").mkdir()
+
+    files = SimpleNamespace(
+        files=[
+            SimpleNamespace(did=did, input_files=[path for d, path in shards if d == did])
+            for did in ("a", "b")
+        ]
+    )
+    with FakeOllama(dimension=8) as fake:
+        job = Algorithm(
+            SimpleNamespace(
+                files=files,
+                parameters={
+                    "base_url": fake.url,
+                    "output_dir": str(tmp_path / "out"),
+                    "file_workers": 2,
+                    "metrics": False,
+                },
+            )
+        ).run()
+
+    reports = {(report["did"], report["file"]): report for report in job.results["files"]}
+    assert reports[("b", "broken.csv")]["status"] == "failed"
+    records_read = sum(reports[(did, path.name)]["details"]["records"] for did, path in shards[:3])
+    assert records_read == len(records)
+    assert all(report["seconds"] >= 0 for report in reports.values())
+    assert (tmp_path / "out" / "a" / "1.json" / "manifest.json").exists()
+    assert json.loads((tmp_path / "out" / "files.json").read_text()) == job.results["files"]
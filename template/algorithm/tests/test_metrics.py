@@ -0,0 +1,50 @@
+import sys
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from src.implementation.metrics import Histogram, Metrics
+
+
+def test_histogram_quantiles():
+    values = np.random.default_rng(0).exponential(0.05, size=10_000)
+    histogram = Histogram()
+    for value in values:
+        histogram.observe(value)
+
+    assert histogram.count == len(values)
+    # Within the resolution of the buckets around the true quantiles
+    assert 0.025 <= histogram.quantile(0.5) <= 0.05
+    assert 0.1 <= histogram.quantile(0.99) <= 0.5
+    assert histogram.quantile(1) <= values.max()
+
+
+def test_openmetrics_text():
+    metrics = Metrics()
+    metrics.count("embed.retries", 2)
+    metrics.gauge("output.bytes", 10, file="result.json")
+    metrics.observe("embed.request_seconds", 0.02)
+    with metrics.phase("index"):
+        pass
+
+    text = metrics.to_openmetrics()
+
+    assert "embed_retries_total 2" in text
+    assert 'output_bytes{file="result.json"} 10' in text
+    assert 'embed_request_seconds_bucket{le="0.025"} 1' in text
+    assert 'embed_request_seconds_bucket{le="+Inf"} 1' in text
+    assert 'phase_seconds{phase="index"}' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_disabled_metrics_record_nothing(tmp_path):
+    metrics = Metrics(enabled=False)
+    metrics.count("embed.retries")
+    metrics.observe("embed.request_seconds", 0.1)
+    with metrics.phase("run"):
+        pass
+    metrics.write(tmp_path)
+
+    assert metrics.to_dict() == {"phases": {}, "counters": {}, "gauges": {}, "histograms": {}}
+    assert not (tmp_path / "metrics.json").exists()
@@ -0,0 +1,59 @@
+import json
+import sys
+from pathlib import Path
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from pytest import mark, raises
+from src.implementation.output import VectorWriter
+
+
+def _write(path: Path, format: str, dtype: str = "float32") -> dict:
+    writer = VectorWriter(path, format=format, dtype=dtype)
+    for start in range(0, 10, 4):
+        rows = range(start, min(start + 4, 10))
+        writer.write(
+            [[float(i), float(i) / 2, -float(i)] for i in rows],
+            [(i, 0, i * 10, i, i) for i in rows],
+        )
+    return writer.close()
+
+
+@mark.parametrize("dtype", ["float32", "float16"])
+def test_npy_output_is_memory_mappable(tmp_path, dtype):
+    manifest = _write(Path(tmp_path), "npy", dtype)
+
+    vectors = np.load(tmp_path / manifest["embeddings"], mmap_mode="r")
+    sources = np.load(tmp_path / manifest["sources"], mmap_mode="r")
+
+    assert vectors.dtype == np.dtype(dtype)
+    assert vectors.shape == (10, 3)
+    assert sources.shape == (10, 5)
+    assert np.allclose(vectors[7], [7.0, 3.5, -7.0])
+    assert sources[7].tolist() == [7, 0, 70, 7, 7]
+    assert json.loads((tmp_path / "manifest.json").read_text())["rows"] == 10
+
+
+def test_json_output(tmp_path):
+    manifest = _write(Path(tmp_path), "json")
+
+    vectors = json.loads((tmp_path / manifest["embeddings"]).read_text())
+    sources = json.loads((tmp_path / manifest["sources"]).read_text())
+
+    assert manifest["dimension"] == 3
+    assert len(vectors) == len(sources) == 10
+    assert vectors[3] == [3.0, 1.5, -3.0]
+
+
+def test_empty_output(tmp_path):
+    manifest = VectorWriter(Path(tmp_path), format="npy").close()
+
+    assert manifest["rows"] == 0
+    assert np.load(tmp_path / "embeddings.npy").shape == (0, 0)
+
+
+def test_invalid_format(tmp_path):
+    with raises(ValueError):
+        VectorWriter(Path(tmp_path), format="parquet")
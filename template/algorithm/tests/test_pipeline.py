@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+# Append relative src directory to path
+sys.path.append("src")
+
+import numpy as np
+from pytest import mark, raises
+from src.implementation.chunking import split_records
+from src.implementation.dedup import Deduplicator
+from src.implementation.output import VectorWriter
+from src.implementation.pipeline import Checkpoint, EmbeddingPipeline
+
+RECORDS = [{"id": i % 40, "text": f"record {i % 40} " * (i % 5 * 40)} for i in range(200)]
+
+
+class FlakyEmbedder:
+    """Deterministic embeddings that fail after `fail_after` calls."""
+
+    def __init__(self, fail_after: int = -1) -> None:
+        self.fail_after = fail_after
+        self.texts: list[str] = []
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        if self.fail_after == 0:
+            raise ConnectionError("Embedding server went away")
+        self.fail_after -= 1
+        self.texts.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 997), 1.0] for text in texts]
+
+
+def _run(path: Path, embed: FlakyEmbedder, format: str) -> dict:
+    checkpoint = Checkpoint(path / "checkpoint.json", "fingerprint")
+    state = checkpoint.load()
+    writer = VectorWriter(path, format=format, resume=state["writer"] if state else None)
+    pipeline = EmbeddingPipeline(
+        embed,
+        writer,
+        Deduplicator(),
+        batch_size=4,
+        queue_size=2,
+        checkpoint=checkpoint,
+        checkpoint_every=2,
+    )
+    try:
+        assert pipeline.run(split_records(RECORDS, chunk_size=200, workers=1)) == 200
+    finally:
+        manifest = writer.close()
+    checkpoint.clear()
+    return manifest
+
+
+def _load(path: Path, manifest: dict) -> tuple[np.ndarray, np.ndarray]:
+    from src.implementation.output import load_embeddings, load_sources
+
+    return np.array(load_embeddings(path, manifest)), np.array(load_sources(path, manifest))
+
+
+@mark.parametrize("format", ["npy", "json"])
+def test_resume_after_failure(tmp_path, format):
+    expected_dir, resumed_dir = Path(tmp_path) / "expected", Path(tmp_path) / "resumed"
+    complete = FlakyEmbedder()
+    expected = _load(expected_dir, _run(expected_dir, complete, format))
+
+    with raises(ConnectionError):
+        _run(resumed_dir, FlakyEmbedder(fail_after=7), format)
+    assert (resumed_dir / "checkpoint.json").exists()
+
+    resumed = FlakyEmbedder()
+    manifest = _run(resumed_dir, resumed, format)
+
+    assert (_load(resumed_dir, manifest)[0] == expected[0]).all()
+    assert (_load(resumed_dir, manifest)[1] == expected[1]).all()
+    # Only the batches after the last checkpoint (batches 5 to 7) were embedded again
+    assert len(resumed.texts) < len(complete.texts) - 4 * 4
+    assert not (resumed_dir / "checkpoint.json").exists()
+
+
+def test_mismatched_checkpoint_is_ignored(tmp_path):
+    Checkpoint(Path(tmp_path) / "checkpoint.json", "old").save({"records": 1})
+
+    assert Checkpoint(Path(tmp_path) / "checkpoint.json", "new").load() is None
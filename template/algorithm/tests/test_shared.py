@@ -0,0 +1,19 @@
+from pathlib import Path
+
+from pytest import mark, skip
+
+# Modules copied into both algorithm trees, see the note at the top of each
+SHARED = ("daemon.py", "executor.py", "source.py")
+TREES = ("template", "sample_timeseries_forecast")
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+@mark.parametrize("module", SHARED)
+def test_shared_modules_are_identical(module):
+    copies = [ROOT / tree / "algorithm" / "src" / "implementation" / module for tree in TREES]
+    if not all(copy.exists() for copy in copies):
+        skip("Only one algorithm tree is present, as in a built image")
+
+    first, *others = (copy.read_bytes() for copy in copies)
+    assert all(other == first for other in others), f"{module} differs between {TREES}"
@@ -0,0 +1,58 @@
+import gzip
+import io
+import json
+import os
+import sys
+
+# Append relative src directory to path
+sys.path.append("src")
+
+from pytest import importorskip, mark, raises
+from src.implementation.ingest import iter_records
+from src.implementation.source import MODES, ReadAhead, filesystem, open_input
+
+DATA = os.urandom(3 * 2**20 + 17)
+
+
+@mark.parametrize("mode", MODES)
+@mark.parametrize("compress", [None, "gz", "zst"])
+def test_reads_every_byte(tmp_path, mode, compress):
+    path = tmp_path / "input"
+    if compress == "gz":
+        path.write_bytes(gzip.compress(DATA, 1))
+    elif compress == "zst":
+        zstandard = importorskip("zstandard")
+        path.write_bytes(zstandard.ZstdCompressor().compress(DATA))
+    else:
+        path.write_bytes(DATA)
+
+    chunks = []
+    with open_input(path, mode=mode) as f:
+        while chunk := f.read(100_003):
+            chunks.append(chunk)
+    assert b"".join(chunks) == DATA
+
+
+def test_read_ahead_raises_source_errors():
+    class Failing(io.RawIOBase):
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            raise OSError("connection reset")
+
+    with raises(OSError, match="connection reset"):
+        with ReadAhead(Failing()) as f:
+            f.read()
+
+
+def test_reads_compressed_records(tmp_path):
+    records = [{"id": i, "text": f"record {i}"} for i in range(1000)]
+    path = tmp_path / "records.jsonl.gz"
+    path.write_bytes(gzip.compress("\n".join(map(json.dumps, records)).encode("utf-8")))
+
+    assert list(iter_records(path)) == records
+
+
+def test_filesystem(tmp_path):
+    assert filesystem(tmp_path) is not None
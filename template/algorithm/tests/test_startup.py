@@ -0,0 +1,43 @@
+import sys
+import time
+
+# Append relative src directory to path
+sys.path.append("src")
+
+from pytest import raises
+from src.implementation.startup import ModelWarmup, backoff, started_at
+
+
+def test_backoff_grows_and_times_out():
+    delays = []
+    with raises(TimeoutError):
+        for elapsed in backoff(initial=0.01, factor=2, maximum=0.04, timeout=0.2):
+            delays.append(elapsed)
+
+    gaps = [b - a for a, b in zip(delays, delays[1:])]
+    assert gaps[0] < gaps[-1] < 0.1
+
+
+def test_warmup_reports_unreachable_server():
+    # Nothing listens on the discard port, so the probe never succeeds
+    warmup = ModelWarmup("nomic-embed-text", "http://127.0.0.1:9", timeout=0.3).start()
+
+    with raises(TimeoutError):
+        warmup.wait(timeout=5)
+
+
+def test_started_at_uses_container_start(monkeypatch):
+    monkeypatch.setenv("CONTAINER_START_TS", "1700000000.5")
+    assert started_at() == 1700000000.5
+
+    monkeypatch.setenv("CONTAINER_START_TS", "unknown")
+    assert started_at() <= time.time()
+
+
+def test_warmup_skips_prepared_model(monkeypatch):
+    # As in a job forked from the daemon after its own warm-up
+    monkeypatch.setattr("src.implementation.startup._READY", {("http://127.0.0.1:9", "nomic-embed-text")})
+    warmup = ModelWarmup("nomic-embed-text", "http://127.0.0.1:9/", timeout=0.3).start()
+
+    warmup.wait(timeout=5)
+    assert list(warmup.timings) == ["model_loaded"]